@@ -0,0 +1,90 @@
+"""
+Inventory fixtures for the RTFM benchmarks.
+
+The ``objects.inv`` files under ``benchmarks/fixtures`` are checked in and pinned by their SHA-256, so
+every run measures the same entries, offline or not. The ones checked in were generated from the
+CPython 3.11 standard library and the enhanced-dpy 1.7.3.7 sources, in the format Sphinx writes, as
+the live docs couldn't be fetched at the time. ``python -m benchmarks.fixtures`` replaces them with
+the live inventories and prints the checksums to pin in ``FIXTURES``. Synthetic inventories of any
+size can be generated with ``synthetic_inventory`` for scaling runs.
+"""
+import hashlib
+import os
+import random
+import urllib.request
+import zlib
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(HERE, 'fixtures')
+
+# name -> (docs the live inventory comes from, SHA-256 of the checked-in file)
+FIXTURES = {
+    'python': ('https://docs.python.org/3', 'c627cd857958b2d813fe2037dd2d3c72863197768480ef22ed310223502b091a'),
+    'enhanced-dpy': ('https://enhanced-dpy.readthedocs.io/en/latest', '8638115c8b0632fc8a38664b3473703a64921dfee3ec2b7c13026604ebf519ab'),
+}
+
+_DIRECTIVES = ('py:class', 'py:method', 'py:function', 'py:attribute', 'py:data', 'py:module', 'std:label', 'std:doc', 'std:term')
+_WORDS = (
+    'abc', 'async', 'await', 'channel', 'client', 'context', 'embed', 'event', 'file', 'gather', 'guild', 'http',
+    'interaction', 'loop', 'member', 'message', 'os', 'path', 'reader', 'request', 'role', 'send', 'socket',
+    'stream', 'task', 'thread', 'user', 'view', 'webhook', 'writer', 'zlib',
+)
+
+
+def fixture_path(name):
+    return os.path.join(FIXTURE_DIR, f'{name}.inv')
+
+
+def fetch_fixtures():
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, (page, _) in FIXTURES.items():
+        with urllib.request.urlopen(page + '/objects.inv') as resp:
+            data = resp.read()
+        with open(fixture_path(name), 'wb') as f:
+            f.write(data)
+        print(f'fetched {name} -> {fixture_path(name)}, sha256 {hashlib.sha256(data).hexdigest()}')
+
+
+def load_fixture(name):
+    """Returns the raw bytes of a checked-in fixture, raising ValueError if it isn't the pinned one."""
+    with open(fixture_path(name), 'rb') as f:
+        data = f.read()
+
+    digest = hashlib.sha256(data).hexdigest()
+    if digest != FIXTURES[name][1]:
+        raise ValueError(f'fixture {name!r} has sha256 {digest}, expected {FIXTURES[name][1]}')
+    return data
+
+
+def synthetic_inventory(size, *, projname='synthetic', seed=0):
+    """Builds a valid ``objects.inv`` with ``size`` entries that look like real Sphinx output."""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(size):
+        directive = rng.choice(_DIRECTIVES)
+        parts = [rng.choice(_WORDS) for _ in range(rng.randint(1, 4))]
+        if directive.startswith('py:'):
+            parts[-1] = parts[-1].capitalize() if directive == 'py:class' else parts[-1]
+            name = '.'.join(parts) + f'{i}'
+            lines.append(f'{name} {directive} 1 library/{parts[0]}.html#$ -')
+        else:
+            name = '-'.join(parts) + f'-{i}'
+            lines.append(f'{name} {directive} -1 {parts[0]}/{name}.html {" ".join(parts).title()} {i}')
+
+    header = (
+        '# Sphinx inventory version 2\n'
+        f'# Project: {projname}\n'
+        '# Version: 1.0\n'
+        '# The remainder of this file is compressed using zlib.\n'
+    )
+    return header.encode('utf-8') + zlib.compress(('\n'.join(lines) + '\n').encode('utf-8'), 9)
+
+
+def inventories():
+    """Yields (name, raw bytes) for every checked-in benchmark inventory."""
+    for name in FIXTURES:
+        yield name, load_fixture(name)
+
+
+if __name__ == '__main__':
+    fetch_fixtures()
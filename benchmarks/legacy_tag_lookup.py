@@ -0,0 +1,139 @@
+"""
+Compares resolving a legacy !tag by name the old way (LOWER(name) lookup, then a second query when
+it's an alias) with the single legacy_tags.resolve query, with and without tags_lower_name_idx.
+Both are checked to return the same row, for the timed lookups and then for every name in the table.
+
+    python -m benchmarks.legacy_tag_lookup [--dsn postgres://...] [--rows 100000] [--lookups 2000]
+
+Needs a Postgres server (the "db" DSN from config.json by default). Everything happens in a temporary
+"tags" table, which shadows the real one for this session only.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import asyncpg
+
+from utils.queries import QUERIES
+
+OLD_BY_NAME = "SELECT * FROM tags WHERE LOWER(name) = $1"
+OLD_ALIAS = "SELECT * FROM tags WHERE name = $1"
+ALIAS_SHARE = 0.2  # of the rows, and so of the lookups
+DANGLING_SHARE = 0.05  # of the aliases, pointing at a tag that no longer exists
+MISS_SHARE = 0.05  # of the lookups, for a name that doesn't exist
+
+
+async def setup(conn, rows):
+    await conn.execute("""
+        CREATE TEMPORARY TABLE tags (
+            name TEXT PRIMARY KEY,
+            content TEXT,
+            owner_id BIGINT,
+            created_at BIGINT,
+            aliases TEXT,
+            tag_id SERIAL
+        )
+    """)
+    records = []
+    for i in range(rows):
+        name = f"Tag-{i}"
+        if i and random.random() < ALIAS_SHARE:
+            target = f"Tag-gone-{i}" if random.random() < DANGLING_SHARE else f"Tag-{random.randrange(i)}"
+            records.append((name, None, 1, 0, target))
+        else:
+            records.append((name, "x" * 200, 1, 0, None))
+    await conn.copy_records_to_table("tags", records=records, columns=("name", "content", "owner_id", "created_at", "aliases"))
+    await conn.execute("ANALYZE tags")
+
+
+async def old_path(conn, name):
+    data = await conn.fetchrow(OLD_BY_NAME, name)
+    if data and data['aliases']:
+        data = await conn.fetchrow(OLD_ALIAS, data['aliases'])
+    return data
+
+
+async def new_path(conn, name):
+    return await conn.fetchrow(QUERIES["legacy_tags.resolve"], name)
+
+
+async def mismatches(conn, names):
+    count = 0
+    for name in names:
+        old, new = await old_path(conn, name), await new_path(conn, name)
+        if (old and dict(old)) != (new and dict(new)):
+            count += 1
+            print(f"  {name!r}: old path {old}, single query {new}")
+    return count
+
+
+async def check(conn, names):
+    wrong = await mismatches(conn, names)
+    if wrong:
+        raise SystemExit(f"{wrong} of {len(names)} lookups resolved differently")
+    print(f"  both paths return the same row for all {len(names)} lookups")
+
+
+async def measure(conn, resolve, names):
+    timings = []
+    for name in names:
+        start = time.perf_counter()
+        await resolve(conn, name)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label, timings):
+    timings.sort()
+    print(
+        f"  {label:<36} p50 {statistics.median(timings) * 1000:8.3f} ms"
+        f"   p99 {timings[int(len(timings) * 0.99)] * 1000:8.3f} ms"
+    )
+
+
+async def compare(conn, names, label):
+    # aliases are where the second round trip goes away, so they're reported on their own too
+    aliases = {r['name'].lower() for r in await conn.fetch("SELECT name FROM tags WHERE aliases IS NOT NULL")}
+    for kind, subset in (("all", names), ("aliases", [n for n in names if n in aliases])):
+        report(f"old, {label}, {kind}", await measure(conn, old_path, subset))
+        report(f"single query, {label}, {kind}", await measure(conn, new_path, subset))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dsn')
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    dsn = args.dsn
+    if dsn is None:
+        with open('config.json') as f:
+            dsn = json.load(f)['db']
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        await setup(conn, args.rows)
+        names = [
+            f"tag-{random.randrange(args.rows)}" if random.random() >= MISS_SHARE else f"tag-missing-{i}"
+            for i in range(args.lookups)
+        ]
+        print(f"{args.rows} tags, {args.lookups} lookups, ~{ALIAS_SHARE:.0%} of them aliases")
+        await check(conn, names)
+
+        await compare(conn, names, "no index")
+
+        await conn.execute("CREATE INDEX ON tags (LOWER(name))")
+        await conn.execute("ANALYZE tags")
+        # every name, now that it's quick to
+        await check(conn, [f"tag-{i}" for i in range(args.rows)])
+        await compare(conn, names, "with index")
+    finally:
+        await conn.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""
+Measures how long a Paginator button press takes to render its page, with show_entry_nums on.
+
+    python -m benchmarks.paginator [--sizes 10000 100000] [--presses 50]
+
+"legacy" numbers every entry on every press, as Paginator did before it rendered a page at a time,
+"uncached" renders only the page but never reuses it, and "cached" is the Paginator as it's used.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+
+from utils.views import Paginator
+
+
+class LegacyPaginator(Paginator):
+    def format_entries(self, entries):
+        num = (self.page - 1) * self.per_page
+        x = []
+        for i, n in enumerate(self.source.entries, start=1):
+            x.append(f"`[{i}]` {n}")
+        return self.prefix + "\n".join(x[num:num + self.per_page]) + self.suffix
+
+
+async def edit_message(**kwargs):
+    pass
+
+
+async def press(paginator, steps):
+    interaction = SimpleNamespace(response=SimpleNamespace(edit_message=edit_message))
+    timings = []
+    for step in steps:
+        start = time.perf_counter()
+        await paginator.send_page(interaction, paginator.page + step)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--presses', type=int, default=50)
+    args = parser.parse_args()
+
+    ctx = SimpleNamespace(author=SimpleNamespace(id=0))
+    for size in args.sizes:
+        entries = [f"[**#{i}**] tag-{i}" for i in range(size)]
+        print(f'{size} entries')
+        for name, cls, cache_pages in (('legacy', LegacyPaginator, 0), ('uncached', Paginator, 0), ('cached', Paginator, 10)):
+            paginator = cls(ctx, entries=entries, per_page=15, show_entry_nums=True, author=None, cache_pages=cache_pages)
+            new = await press(paginator, [1] * args.presses)
+            # back and forth over the last few pages, like someone looking for an entry they just scrolled past
+            revisits = await press(paginator, ([-1] * 4 + [1] * 4) * (args.presses // 8 + 1))
+            print(
+                f'  {name:<9} new page p50 {statistics.median(new) * 1000:9.3f} ms'
+                f'   revisit p50 {statistics.median(revisits) * 1000:9.3f} ms'
+                f'   max {max(new + revisits) * 1000:9.3f} ms'
+            )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
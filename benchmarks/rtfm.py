@@ -0,0 +1,199 @@
+"""
+Benchmarks the RTFM pipeline: decoding, parsing, indexing, memory and query latency.
+
+    python -m benchmarks.rtfm [--sizes 10000,100000,1000000] [--output results.json] [--compare old.json]
+
+Runs over the checked-in fixtures (see benchmarks/fixtures.py) and synthetic inventories of the given
+sizes. ``--output`` writes the results as JSON, ``--compare`` prints the change against an earlier run.
+
+Every sample query is also run through plain ``finder``, and the run fails if ``RTFMIndex.search``
+didn't return the same top 8. finder is slow on big inventories, ``--check-queries`` checks fewer.
+"""
+import argparse
+import datetime
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from operator import itemgetter
+
+from utils.rtfm import RTFMIndex, SphinxObjectFileReader, finder, parse_object_inv
+from benchmarks.fixtures import inventories, synthetic_inventory
+
+URL = 'https://example.com'
+
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def make_queries(index, count, seed=0):
+    # a mix of what people type: exact names, fragments, sloppy abbreviations and misses
+    rng = random.Random(seed)
+    names = list(index.entries)
+    queries = []
+    for i in range(count):
+        name = rng.choice(names)
+        kind = i % 4
+        if kind == 0:
+            queries.append(name)
+        elif kind == 1:
+            start = rng.randrange(len(name))
+            queries.append(name[start:start + rng.randint(3, 12)])
+        elif kind == 2:
+            queries.append(''.join(c for c in name if rng.random() > 0.3)[:12] or name)
+        else:
+            queries.append(f'zz{rng.randrange(10 ** 6)}')
+    return queries
+
+
+def time_queries(search, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def check_queries(index, items, queries):
+    # the queries search ranks differently from finder, and finder's timings while we're at it
+    samples = []
+    mismatches = []
+    for query in queries:
+        start = time.perf_counter()
+        expected = finder(query, items, key=itemgetter(0), lazy=False)[:8]
+        samples.append(time.perf_counter() - start)
+        if index.search(query) != expected:
+            mismatches.append(query)
+    return summarize(samples), mismatches
+
+
+def summarize(samples):
+    return {
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000,
+        'mean_ms': statistics.fmean(samples) * 1000,
+    }
+
+
+def bench_inventory(data, queries, checked):
+    result = {'compressed_bytes': len(data)}
+
+    start = time.perf_counter()
+    reader = SphinxObjectFileReader(data)
+    for _ in range(4):
+        reader.readline()
+    decoded = sum(len(line) + 1 for line in reader.read_compressed_lines())
+    elapsed = time.perf_counter() - start
+    result['decoded_bytes'] = decoded
+    result['decode_mb_s'] = decoded / elapsed / 1024 / 1024
+
+    start = time.perf_counter()
+    entries = parse_object_inv(SphinxObjectFileReader(data), URL)
+    result['parse_ms'] = (time.perf_counter() - start) * 1000
+    result['entries'] = len(entries)
+
+    start = time.perf_counter()
+    index = RTFMIndex(entries)
+    result['index_ms'] = (time.perf_counter() - start) * 1000
+    result['index_mib'] = index.memory / 1024 / 1024
+
+    sample = make_queries(index, queries)
+    result['search'] = time_queries(index.search, sample)
+    result['autocomplete'] = time_queries(lambda q: index.search(q, limit=25, fuzzy=False), sample)
+    if checked != 0:
+        result['finder'], result['mismatches'] = check_queries(index, list(entries.items()), sample[:checked])
+
+    entries = index = None
+    # measured separately, tracemalloc slows everything it watches down
+    tracemalloc.start()
+    index = RTFMIndex(parse_object_inv(SphinxObjectFileReader(data), URL))
+    result['peak_mib'] = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+
+    return result
+
+
+def compare(current, baseline):
+    print(f"\nchange against {baseline.get('commit') or 'baseline'}:")
+    for name, new in current['inventories'].items():
+        old = baseline['inventories'].get(name)
+        if old is None:
+            continue
+        parts = []
+        for label, get in (
+            ('parse', lambda r: r['parse_ms']),
+            ('index', lambda r: r['index_ms']),
+            ('peak', lambda r: r['peak_mib']),
+            ('search p50', lambda r: r['search']['p50_ms']),
+            ('search p99', lambda r: r['search']['p99_ms']),
+        ):
+            try:
+                parts.append(f'{label} {(get(new) / get(old) - 1) * 100:+.1f}%')
+            except (KeyError, ZeroDivisionError):
+                continue
+        print(f'  {name:<16} ' + ', '.join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='synthetic inventory sizes, comma separated')
+    parser.add_argument('--queries', type=int, default=500, help='queries timed per inventory')
+    parser.add_argument('--check-queries', type=int, help='queries checked against (and timed with) plain finder, all by default, 0 to skip')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='a JSON file from an earlier run to compare against')
+    args = parser.parse_args()
+
+    sources = list(inventories())
+    for size in filter(None, args.sizes.split(',')):
+        sources.append((f'synthetic-{size}', synthetic_inventory(int(size))))
+
+    results = {
+        'commit': commit(),
+        'python': platform.python_version(),
+        'date': datetime.datetime.utcnow().isoformat(),
+        'inventories': {},
+    }
+
+    failed = False
+    for name, data in sources:
+        r = results['inventories'][name] = bench_inventory(data, args.queries, args.check_queries)
+        line = (
+            f"{name:<16} {r['entries']:>8} entries  decode {r['decode_mb_s']:7.1f} MB/s  parse {r['parse_ms']:8.1f} ms  "
+            f"index {r['index_ms']:8.1f} ms  peak {r['peak_mib']:7.1f} MiB  "
+            f"search p50/p99 {r['search']['p50_ms']:.3f}/{r['search']['p99_ms']:.3f} ms"
+        )
+        if 'finder' in r:
+            line += f"  finder p50/p99 {r['finder']['p50_ms']:.3f}/{r['finder']['p99_ms']:.3f} ms"
+        print(line, flush=True)
+        if r.get('mismatches'):
+            failed = True
+            print(f"  search ranked {len(r['mismatches'])} queries differently from finder: {r['mismatches'][:10]}", flush=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+    if failed:
+        return 'RTFMIndex.search and finder disagreed, see above'
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""
+Compares the streaming inventory decoder against the old ``buf += chunk`` / ``buf = buf[pos + 1:]`` one.
+
+    python -m benchmarks.rtfm_decode [-n RUNS]
+"""
+import argparse
+import time
+import zlib
+from io import BytesIO
+
+from utils.rtfm import InventoryParser, SphinxObjectFileReader, parse_object_inv
+from benchmarks.fixtures import inventories
+
+
+class LegacyReader:
+    # the reader as it was before the streaming decoder, kept verbatim for comparison
+    BUFSIZE = 16 * 1024
+
+    def __init__(self, buffer):
+        self.stream = BytesIO(buffer)
+
+    def readline(self):
+        return self.stream.readline().decode('utf-8')
+
+    def read_compressed_chunks(self):
+        decompressor = zlib.decompressobj()
+        while True:
+            chunk = self.stream.read(self.BUFSIZE)
+            if len(chunk) == 0:
+                break
+            yield decompressor.decompress(chunk)
+        yield decompressor.flush()
+
+    def read_compressed_lines(self):
+        buf = b''
+        for chunk in self.read_compressed_chunks():
+            buf += chunk
+            pos = buf.find(b'\n')
+            while pos != -1:
+                yield buf[:pos].decode('utf-8')
+                buf = buf[pos + 1:]
+                pos = buf.find(b'\n')
+
+
+def legacy_lines(data):
+    stream = LegacyReader(data)
+    for _ in range(4):
+        stream.readline()
+    return sum(1 for _ in stream.read_compressed_lines())
+
+
+def streaming_lines(data):
+    stream = SphinxObjectFileReader(data)
+    for _ in range(4):
+        stream.readline()
+    return sum(1 for _ in stream.read_compressed_lines())
+
+
+def streaming_parse(data):
+    # mimics aiohttp's iter_chunked: the parser never sees the whole body at once
+    parser = InventoryParser('https://example.com')
+    for i in range(0, len(data), InventoryParser.BUFSIZE):
+        parser.feed(data[i:i + InventoryParser.BUFSIZE])
+    return len(parser.close())
+
+
+def buffered_parse(data):
+    return len(parse_object_inv(SphinxObjectFileReader(data), 'https://example.com'))
+
+
+def best_of(func, data, runs):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, data in inventories():
+        size = len(SphinxObjectFileReader(data).stream.getvalue())
+        print(f'{name}: {size / 1024:.0f} KiB compressed, {legacy_lines(data)} lines')
+        for label, func in (
+            ('legacy decode', legacy_lines),
+            ('cursor decode', streaming_lines),
+            ('buffered parse', buffered_parse),
+            ('streamed parse', streaming_parse),
+        ):
+            print(f'  {label:<16} {best_of(func, data, args.runs) * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Times the whole !rtfm path in Devision.do_rtfm, from fetching or loading the inventory to the reply
+embed, on the checked-in fixtures (see benchmarks/fixtures.py).
+
+    python -m benchmarks.rtfm_lookup [--executor process] [--queries 500]
+
+The cog runs as is, against a stand-in bot whose session serves the fixture (with an ETag, so
+revalidation gets a 304) and a context that keeps the replies. Three stages are timed per fixture:
+
+    cold      nothing saved yet: download, parse, index, save, search and reply
+    restart   a new cog with the saved copy: load it, search and reply
+    lookup    the index already in memory, once for new queries and once again for cached ones
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+import types
+
+from cogs.devision import Devision
+from benchmarks.fixtures import inventories
+from benchmarks.rtfm import make_queries, summarize
+
+URL = 'https://example.com/'
+ETAG = '"fixture"'
+
+
+class Response:
+    def __init__(self, data, headers):
+        self.data = data
+        self.status = 304 if headers.get('If-None-Match') == ETAG else 200
+        self.headers = {'ETag': ETAG}
+        self.content = self
+
+    async def iter_chunked(self, size):
+        for start in range(0, len(self.data), size):
+            yield self.data[start:start + size]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class Session:
+    def __init__(self, pages):
+        self.pages = pages
+        self.downloads = 0
+
+    def get(self, url, headers=None):
+        resp = Response(self.pages[url], headers or {})
+        self.downloads += resp.status == 200
+        return resp
+
+
+class Context:
+    guild = types.SimpleNamespace(icon=types.SimpleNamespace(url='https://example.com/icon.png'))
+
+    def __init__(self):
+        self.replies = []
+
+    async def send(self, content=None, *, embed=None):
+        self.replies.append(embed or content)
+
+    async def trigger_typing(self):
+        pass
+
+
+def make_bot(key, session, cache, executor):
+    async def wait_until_ready():
+        # the refresh loop never gets going, the benchmark drives everything
+        await asyncio.Event().wait()
+
+    return types.SimpleNamespace(
+        config={'rtfm': {key: URL + key}, 'rtfm_cache': cache, 'rtfm_executor': executor},
+        http=types.SimpleNamespace(token=None),
+        session=session,
+        loop=asyncio.get_running_loop(),
+        wait_until_ready=wait_until_ready,
+    )
+
+
+async def settle(cog):
+    # a first use from the saved copy revalidates it in the background
+    while cog._rtfm_builds:
+        await asyncio.gather(*cog._rtfm_builds.values(), return_exceptions=True)
+
+
+async def first_use(bot, key, query):
+    cog = Devision(bot)
+    ctx = Context()
+    start = time.perf_counter()
+    await cog.do_rtfm(ctx, key, query)
+    elapsed = time.perf_counter() - start
+    await settle(cog)
+    return cog, elapsed
+
+
+async def lookups(cog, key, queries):
+    ctx = Context()
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        await cog.do_rtfm(ctx, key, query)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def bench(key, data, executor, count):
+    session = Session({f'{URL}{key}/objects.inv': data})
+    with tempfile.TemporaryDirectory() as cache:
+        bot = make_bot(key, session, cache, executor)
+
+        cog, cold = await first_use(bot, key, 'Embed')
+        cog.cog_unload()
+
+        cog, restart = await first_use(bot, key, 'Embed')
+        queries = make_queries(cog.rtfm.peek(key), count)
+        new = await lookups(cog, key, queries)
+        cached = await lookups(cog, key, queries)
+        cog.cog_unload()
+
+    print(
+        f"{key:<16} cold {cold * 1000:8.1f} ms  restart {restart * 1000:8.1f} ms  "
+        f"lookup p50/p99 {new['p50_ms']:.3f}/{new['p99_ms']:.3f} ms  "
+        f"cached p50/p99 {cached['p50_ms']:.3f}/{cached['p99_ms']:.3f} ms  ({session.downloads} downloads)",
+        flush=True,
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--executor', default='process', choices=('inline', 'thread', 'process'), help='the "rtfm_executor" to run with')
+    parser.add_argument('--queries', type=int, default=500, help='lookups timed per fixture')
+    args = parser.parse_args()
+
+    for name, data in inventories():
+        await bench(name, data, args.executor, args.queries)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
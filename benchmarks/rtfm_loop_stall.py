@@ -0,0 +1,52 @@
+"""
+Measures how long the event loop is blocked while an inventory is parsed and indexed in each
+InventoryWorker mode.
+
+    python -m benchmarks.rtfm_loop_stall
+"""
+import asyncio
+import time
+
+from utils.rtfm import InventoryWorker, build_index
+from benchmarks.fixtures import inventories
+
+TICK = 0.001
+
+
+async def watch_loop(stalls, stop):
+    # a heartbeat-like task, anything much later than TICK is time the loop spent blocked
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        stalls.append(time.perf_counter() - start - TICK)
+
+
+async def measure(mode, data):
+    worker = InventoryWorker(mode)
+    await worker.run(build_index, data, 'https://example.com')  # warm up the pool
+
+    stalls = []
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(watch_loop(stalls, stop))
+    await asyncio.sleep(TICK * 5)
+
+    start = time.perf_counter()
+    await worker.run(build_index, data, 'https://example.com')
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await watcher
+    worker.close()
+    return worker.mode, elapsed, max(stalls)
+
+
+async def main():
+    for name, data in inventories():
+        print(name)
+        for mode in ('inline', 'thread', 'process'):
+            used, elapsed, stall = await measure(mode, data)
+            print(f'  {used:<8} build {elapsed * 1000:8.2f} ms   longest loop stall {stall * 1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -7,6 +7,12 @@ import asyncpg
 
 from discord.ext import commands
 from utils.views import AccessRoles, CharlesNews, ApiNews, GamesNews
+from utils.tagcache import TagCache
+from utils.tagusage import TagUsage
+from utils.tagstats import TagStats
+from utils.queries import Connection, Queries
+from utils.outbox import Outbox
+from utils.timers import TimerService
 
 print('[CONNECT] Logging in...')
 
@@ -31,11 +37,17 @@ class Alfred(commands.Bot):
             owner_ids=[171539705043615744, 547861735391100931],
             slash_command_guilds=[514232441498763279])
 
-        # Bot vars
-        self.requests = {}
-
         with open("config.json") as f:
             self.config = json.load(f)
+
+        # Bot vars
+        self.requests = {}
+        self.tag_cache = TagCache(self)
+        self.tag_usage = TagUsage(self)
+        self.tag_stats = TagStats(self)
+        self.queries = Queries(self)
+        self.outbox = Outbox(self)
+        self.timers = TimerService(self)
         
         for ext in ['cogs.help', 'cogs.owner', 'jishaku', 'cogs.devision', 'cogs.tags', 'cogs.reports']:
             self.load_extension(ext)
@@ -69,13 +81,24 @@ class Alfred(commands.Bot):
 
 
     async def bot_logout(self):
+        await self.tag_cache.close()
+        await self.tag_usage.close()
+        self.timers.close()
         await self.session.close()
         await self.db.close()
         await super().close()
 
     async def bot_start(self):
         self.session = aiohttp.ClientSession(loop=self.loop)
-        self.db = await asyncpg.create_pool(dsn=self.config['db'])
+        self.db = await asyncpg.create_pool(
+            dsn=self.config['db'],
+            server_settings={'pg_trgm.similarity_threshold': '0.25'},
+            connection_class=Connection,
+            init=self.queries.init
+        )
+        self.tag_cache.start()
+        self.tag_usage.start()
+        self.timers.start()
         await self.login(self.config['token'])
         await self.setup()
         await self.connect()
@@ -83,4 +106,5 @@ class Alfred(commands.Bot):
     async def get_context(self, message, *, cls=None):
         return await super().get_context(message, cls=CTX)
 
-Alfred().run()
+if __name__ == '__main__':
+    Alfred().run()
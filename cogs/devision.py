@@ -2,65 +2,22 @@ import discord
 import time
 import re
 import os
-from io import BytesIO
-import zlib
-from discord.ext import commands
-from utils.views import Paginator
+import asyncio
+import functools
+from discord.ext import commands, tasks
+from utils.views import KeysetPageSource, Paginator
+from utils.autocomplete import Superseding
+from utils.rtfm import CachedInventory, InventoryParser, InventoryWorker, QueryCache, RTFMRegistry, build_index, finish_index, load_index
 from discord import ui
 
-class SphinxObjectFileReader:
-    # Inspired by Sphinx's InventoryFileReader
-    BUFSIZE = 16 * 1024
-
-    def __init__(self, buffer):
-        self.stream = BytesIO(buffer)
-
-    def readline(self):
-        return self.stream.readline().decode('utf-8')
-
-    def skipline(self):
-        self.stream.readline()
-
-    def read_compressed_chunks(self):
-        decompressor = zlib.decompressobj()
-        while True:
-            chunk = self.stream.read(self.BUFSIZE)
-            if len(chunk) == 0:
-                break
-            yield decompressor.decompress(chunk)
-        yield decompressor.flush()
-
-    def read_compressed_lines(self):
-        buf = b''
-        for chunk in self.read_compressed_chunks():
-            buf += chunk
-            pos = buf.find(b'\n')
-            while pos != -1:
-                yield buf[:pos].decode('utf-8')
-                buf = buf[pos + 1:]
-                pos = buf.find(b'\n')
-
-
-def finder(text, collection, *, key=None, lazy=True):
-    suggestions = []
-    text = str(text)
-    pat = '.*?'.join(map(re.escape, text))
-    regex = re.compile(pat, flags=re.IGNORECASE)
-    for item in collection:
-        to_search = key(item) if key else item
-        r = regex.search(to_search)
-        if r:
-            suggestions.append((len(r.group()), r.start(), item))
-
-    def sort_key(tup):
-        if key:
-            return tup[0], tup[1], key(tup[2])
-        return tup
-
-    if lazy:
-        return (z for _, _, z in sorted(suggestions, key=sort_key))
-    else:
-        return [z for _, _, z in sorted(suggestions, key=sort_key)]
+# more docs can be added through the "rtfm" mapping in config.json
+RTFM_PAGES = {
+    'python': 'https://docs.python.org/3',
+    'enhanced-dpy': 'https://enhanced-dpy.readthedocs.io/en/latest',
+}
+RTFM_MEMORY_BUDGET = 64  # MiB, "rtfm_budget" in config.json
+RTFM_AUTOCOMPLETE_BUDGET = 2  # seconds, discord gives up on autocomplete after 3
+MESSAGEABLE_ATTRS = frozenset(name for name in dir(discord.abc.Messageable) if name[0] != '_')
 
 class Devision(commands.Cog):
     def __init__(self, bot):
@@ -70,114 +27,182 @@ class Devision(commands.Cog):
             "Authorization": f"Bot {self.bot.http.token}",
             "Content-Type": "application/json"
         }
+        self.rtfm_pages = {**RTFM_PAGES, **self.bot.config.get('rtfm', {})}
+        self.rtfm = RTFMRegistry(self.bot.config.get('rtfm_budget', RTFM_MEMORY_BUDGET) * 1024 * 1024)
+        self._rtfm_builds = {}
+        self._rtfm_unvalidated = set()
+        self._rtfm_suggesting = Superseding()
+        self.rtfm_results = QueryCache(self.bot.config.get('rtfm_result_cache', 512))
+        self.rtfm_worker = InventoryWorker(self.bot.config.get('rtfm_executor', 'process'))
+        self.rtfm_refresh.start()
+
+    def cog_unload(self):
+        self.rtfm_refresh.cancel()
+        self.rtfm_worker.close()
+
+    def rtfm_cache_path(self, key):
+        return os.path.join(self.bot.config.get('rtfm_cache', 'rtfm_cache'), f'{key}.inv')
+
+    async def fetch_inventory(self, key, page, current=None, revalidate=True):
+        # current is the index being served right now, it's kept as is when the docs haven't changed
+        path = self.rtfm_cache_path(key)
+        cached = CachedInventory.load_meta(path) if revalidate else None
+        headers = cached.validators if cached and cached.url == page else {}
+
+        async with self.bot.session.get(page + '/objects.inv', headers=headers) as resp:
+            if resp.status == 304 and headers:
+                index = current or await self.rtfm_worker.run(load_index, path, page)
+                if index is not None:
+                    return index
+
+                # the saved copy that was revalidated is gone or unreadable, so it's a full download after all
+                print(f'[RTFM] Saved inventory for {key} is unusable, fetching it again')
+                return await self.fetch_inventory(key, page, revalidate=False)
+
+            if resp.status != 200:
+                raise RuntimeError('Cannot build rtfm lookup table, try again later.')
+
+            etag, last_modified = resp.headers.get('ETag'), resp.headers.get('Last-Modified')
+            if self.rtfm_worker.inline:
+                parser = InventoryParser(page)
+                async for chunk in resp.content.iter_chunked(parser.BUFSIZE):
+                    parser.feed(chunk)
+
+                return finish_index(parser, path, etag, last_modified)
+
+            # the compressed body is small, it's the parsing that has to stay off the loop
+            body = bytearray()
+            async for chunk in resp.content.iter_chunked(InventoryParser.BUFSIZE):
+                body += chunk
+
+        return await self.rtfm_worker.run(build_index, bytes(body), page, path, etag, last_modified)
+
+    def store_rtfm_index(self, key, index):
+        if self.rtfm.peek(key) is not index:
+            self.rtfm_results.clear_docs(key)
+
+        for evicted in self.rtfm.put(key, index):
+            self.rtfm_results.clear_docs(evicted)
+            print(f'[RTFM] Unloaded {evicted} to stay within the memory budget')
+
+    async def build_rtfm_index(self, key):
+        page = self.rtfm_pages[key]
+        current = self.rtfm.peek(key)
+        if current is None and key not in self._rtfm_unvalidated:
+            # first use, serve the copy saved by an earlier run straight away and revalidate it afterwards
+            current = await self.rtfm_worker.run(load_index, self.rtfm_cache_path(key), page)
+            if current is not None:
+                self._rtfm_unvalidated.add(key)
+                self.store_rtfm_index(key, current)
+                return current
+
+        self._rtfm_unvalidated.discard(key)
+        index = await self.fetch_inventory(key, page, current)
+        # swapped in one go, lookups never see a half built index
+        self.store_rtfm_index(key, index)
+        return index
+
+    def refresh_rtfm(self, key):
+        """Starts loading or revalidating an inventory, or returns the task that's already doing so."""
+        task = self._rtfm_builds.get(key)
+        if task is None:
+            task = self._rtfm_builds[key] = self.bot.loop.create_task(self.build_rtfm_index(key))
+            task.add_done_callback(functools.partial(self._rtfm_build_done, key))
+
+        return task
+
+    def _rtfm_build_done(self, key, task):
+        del self._rtfm_builds[key]
+        if task.cancelled():
+            return
 
-    def parse_object_inv(self, stream, url):
-        # key: URL
-        # n.b.: key doesn't have `discord` or `discord.ext.commands` namespaces
-        result = {}
-
-        # first line is version info
-        inv_version = stream.readline().rstrip()
-
-        if inv_version != '# Sphinx inventory version 2':
-            raise RuntimeError('Invalid objects.inv file version.')
-
-        # next line is "# Project: <name>"
-        # then after that is "# Version: <version>"
-        projname = stream.readline().rstrip()[11:]
-        version = stream.readline().rstrip()[11:]  # noqa: F841
-
-        # next line says if it's a zlib header
-        line = stream.readline()
-        if 'zlib' not in line:
-            raise RuntimeError('Invalid objects.inv file, not z-lib compatible.')
-
-        # This code mostly comes from the Sphinx repository.
-        entry_regex = re.compile(r'(?x)(.+?)\s+(\S*:\S*)\s+(-?\d+)\s+(\S+)\s+(.*)')
-        for line in stream.read_compressed_lines():
-            match = entry_regex.match(line.rstrip())
-            if not match:
-                continue
-
-            name, directive, prio, location, dispname = match.groups()
-            domain, _, subdirective = directive.partition(':')
-            if directive == 'py:module' and name in result:
-                # From the Sphinx Repository:
-                # due to a bug in 1.1 and below,
-                # two inventory entries are created
-                # for Python modules, and the first
-                # one is correct
-                continue
-
-            # Most documentation pages have a label
-            if directive == 'std:doc':
-                subdirective = 'label'
+        if task.exception():
+            print(f'[RTFM] Failed to build lookup table for {key}: {task.exception()!r}')
+        elif key in self._rtfm_unvalidated:
+            self.refresh_rtfm(key)
 
-            if location.endswith('$'):
-                location = location[:-1] + name
+    @tasks.loop(hours=6)
+    async def rtfm_refresh(self):
+        # only what's loaded is kept fresh, everything else is fetched on first use
+        builds = [self.refresh_rtfm(key) for key, _ in list(self.rtfm.items())]
+        # failures were already reported by _rtfm_build_done, the next iteration tries again
+        await asyncio.gather(*map(asyncio.shield, builds), return_exceptions=True)
 
-            key = name if dispname == '-' else dispname
-            prefix = f'{subdirective}:' if domain == 'std' else ''
+    @rtfm_refresh.before_loop
+    async def before_rtfm_refresh(self):
+        await self.bot.wait_until_ready()
 
-            if projname == 'discord.py':
-                key = key.replace('discord.ext.commands.', '').replace('discord.', '').replace('ext.menus.', '')
+    def rtfm_query(self, key, obj):
+        obj = re.sub(r'^(?:discord\.(?:ext\.)?)?(?:commands\.)?(.+)', r'\1', obj)
 
-            result[f'{prefix}{key}'] = os.path.join(url, location)
+        if key.startswith('latest'):
+            # point the abc.Messageable types properly:
+            q = obj.lower()
+            if q in MESSAGEABLE_ATTRS:
+                obj = f'abc.Messageable.{q}'
 
-        return result
+        return obj
 
-    async def build_rtfm_lookup_table(self, page_types):
-        cache = {}
-        for key, page in page_types.items():
-            cache[key] = {}
-            async with self.bot.session.get(page + '/objects.inv') as resp:
-                if resp.status != 200:
-                    raise RuntimeError('Cannot build rtfm lookup table, try again later.')
+    def rtfm_lookup(self, key, index, obj):
+        """Normalizes a query and returns it with its top 8 matches, cached per docs set."""
+        obj = self.rtfm_query(key, obj)
+        matches = self.rtfm_results.get(key, obj)
+        if matches is None:
+            matches = index.search(obj, limit=8)
+            self.rtfm_results.put(key, obj, matches)
 
-                stream = SphinxObjectFileReader(await resp.read())
-                cache[key] = self.parse_object_inv(stream, page)
+        return obj, matches
 
-        self._rtfm_cache = cache
+    def rtfm_embed(self, guild, key, obj, matches):
+        e = discord.Embed(colour=0x2F3136, title=f"RTFM Search: `{obj}`")
+        e.set_author(icon_url=guild.icon.url, name=f"Docs: {key}", url=self.rtfm_pages[key])
+        e.set_thumbnail(url="https://readthedocs-static-prod.s3.amazonaws.com/images/home-logo.eaeeed28189e.png")
+        e.description = '\n'.join(f'[`{key}`]({url})' for key, url in matches)
+        return e
 
     async def do_rtfm(self, ctx, key, obj):
-        page_types = {
-            'python': 'https://docs.python.org/3',
-            'enhanced-dpy': 'https://enhanced-dpy.readthedocs.io/en/latest',
-        }
+        if key not in self.rtfm_pages:
+            return await ctx.send(f"I don't know those docs. Try one of: {', '.join(self.rtfm_pages)}")
 
         if obj is None:
-            await ctx.send(page_types[key])
+            await ctx.send(self.rtfm_pages[key])
             return
 
-        if not hasattr(self, '_rtfm_cache'):
+        index = self.rtfm.get(key)
+        if index is None:
+            # first use, every caller waits on the same build
             await ctx.trigger_typing()
-            await self.build_rtfm_lookup_table(page_types)
+            index = await asyncio.shield(self.refresh_rtfm(key))
 
-        obj = re.sub(r'^(?:discord\.(?:ext\.)?)?(?:commands\.)?(.+)', r'\1', obj)
+        obj, matches = self.rtfm_lookup(key, index, obj)
 
-        if key.startswith('latest'):
-            # point the abc.Messageable types properly:
-            q = obj.lower()
-            for name in dir(discord.abc.Messageable):
-                if name[0] == '_':
-                    continue
-                if q == name:
-                    obj = f'abc.Messageable.{name}'
-                    break
+        if len(matches) == 0:
+            return await ctx.send('Could not find anything. Sorry.')
 
-        cache = list(self._rtfm_cache[key].items())
+        await ctx.send(embed=self.rtfm_embed(ctx.guild, key, obj, matches))
 
-        matches = finder(obj, cache, key=lambda t: t[0], lazy=False)[:8]
+    async def _rtfm_suggest(self, key, query):
+        index = self.rtfm.get(key)
+        if index is None:
+            try:
+                index = await asyncio.wait_for(asyncio.shield(self.refresh_rtfm(key)), timeout=RTFM_AUTOCOMPLETE_BUDGET)
+            except Exception:
+                # still building, the build carries on in the background for the next keystroke
+                index = None
 
-        if len(matches) == 0:
-            return await ctx.send('Could not find anything. Sorry.')
+        if index is None:
+            return [query] if query else []
+
+        return [name for name, _ in index.search(self.rtfm_query(key, query), limit=25, fuzzy=False)]
+
+    async def rtfm_suggestions(self, user_id, key, query):
+        """
+        Autocomplete choices for a search, answered from memory.
+
+        A newer keystroke from the same user cancels this one, which then returns nothing.
+        """
+        return await self._rtfm_suggesting.run(user_id, self._rtfm_suggest(key, query), [])
 
-        e = discord.Embed(colour=0x2F3136, title=f"RTFM Search: `{obj}`")
-        e.set_author(icon_url=ctx.guild.icon.url, name=f"Docs: {key}", url=page_types[key])
-        e.set_thumbnail(url="https://readthedocs-static-prod.s3.amazonaws.com/images/home-logo.eaeeed28189e.png")
-        e.description = '\n'.join(f'[`{key}`]({url})' for key, url in matches)
-        await ctx.send(embed=e)
-        
     @commands.Cog.listener('on_message')
     async def publish_datamine(self, message):
         if message.channel.id != 841654142250254336:
@@ -189,18 +214,15 @@ class Devision(commands.Cog):
 
     async def get_tag_data(self, ctx, name_or_id):
         if name_or_id.isdigit():
-            data = await self.bot.db.fetchrow("SELECT * FROM tags WHERE tag_id = $1 AND aliases IS NULL", int(name_or_id))
+            data = await self.bot.queries.fetchrow("legacy_tags.by_id", int(name_or_id))
             if not data:
                 await ctx.send("No tag was found with that ID!")
         else:
-            data = await self.bot.db.fetchrow("SELECT * FROM tags WHERE LOWER(name) = $1", discord.utils.escape_mentions(name_or_id).lower())
+            # aliases are followed by the query itself
+            data = await self.bot.queries.fetchrow("legacy_tags.resolve", discord.utils.escape_mentions(name_or_id).lower())
             if not data:
                 await ctx.send("No tag was found with that name!")
-        
-        if data:
-            if alias := data.get('aliases'):
-                data = await self.bot.db.fetchrow("SELECT * FROM tags WHERE name = $1", alias)
-        
+
         return data
 
     @commands.command()
@@ -219,7 +241,7 @@ class Devision(commands.Cog):
     @tag.command(name="add", aliases=['create', 'make'])
     async def tag_add(self, ctx, name: str, *, content: str):
         name = discord.utils.escape_mentions(name)
-        check = await self.bot.db.fetchval("SELECT tag_id FROM tags WHERE LOWER(name) = $1", name.lower())
+        check = await self.bot.queries.fetchval("legacy_tags.id_by_lower_name", name.lower())
         if check:
             return await ctx.send("A tag with that name already exists!")
         if name.split(' ')[0] in ('add', 'delete', 'del', 'info', 'owner', 
@@ -231,7 +253,7 @@ class Devision(commands.Cog):
         clean_content = discord.utils.escape_mentions(content)
         if len(clean_content) == 0 or len(clean_content) > 2000:
             return await ctx.send("Tag content must be between 0-2000 characters!")
-        await self.bot.db.execute("INSERT INTO tags VALUES($1, $2, $3, (NOW() AT TIME ZONE 'utc'))", name, clean_content, ctx.author.id, int(time.time()))
+        await self.bot.queries.execute("legacy_tags.create", name, clean_content, ctx.author.id, int(time.time()))
         await ctx.send("Tag is successfully created!")
 
     @tag.command(name="delete", aliases=['del'])
@@ -241,7 +263,7 @@ class Devision(commands.Cog):
             return
         if data['owner_id'] != ctx.author.id:
             return await ctx.send("You do not own this tag!")
-        await self.bot.db.execute("DELETE FROM tags WHERE name = $1", data['name'])
+        await self.bot.queries.execute("legacy_tags.delete", data['name'])
         await ctx.send(f"Tag `[#{data['tag_id']}]` **{data['name']}** has been deleted!")
 
     @tag.command(name="info", aliases=['owner'])
@@ -249,11 +271,58 @@ class Devision(commands.Cog):
         data = await self.get_tag_data(ctx, name_or_id)
         if not data:
             return
-        await ctx.send("COMING SOON")
+
+        e = discord.Embed(title=f"Tag {data['name']}", color=0x2F3136)
+        owner = self.bot.get_user(data['owner_id'])
+        if owner:
+            e.set_author(name=str(owner), icon_url=owner.avatar.url)
+        lines = [f"ID: {data['tag_id']}", f"Owned by <@{data['owner_id']}>"]
+
+        # uses are only counted for tags that have been moved over to tags_new
+        tag = await self.bot.queries.fetchrow("tags.info", data['name'].lower())
+        if tag:
+            uses = tag['uses'] or 0
+            recent = await self.bot.tag_stats.tag_recent(tag['tagid'])
+            lines.append(f"Used {uses} time{'s' if uses != 1 else ''}, {recent} in the last week")
+            if rank := self.bot.tag_stats.rank(tag['tagid']):
+                lines.append(f"#{rank} on the leaderboard")
+            lines.append(f"Created <t:{round(tag['created'].timestamp())}:F>")
+
+        e.description = "\n".join(lines)
+        await ctx.send(embed=e)
 
     @tag.command(name="stats", aliases=['leaderboard', 'lb'])
-    async def tag_stats(self, ctx):
-        await ctx.send("COMING SOON")
+    async def tag_stats(self, ctx, member: discord.Member = None):
+        stats = self.bot.tag_stats
+        e = discord.Embed(color=0x2F3136)
+
+        if member:
+            owner = await stats.owner(member.id)
+            e.set_author(name=str(member), icon_url=member.display_avatar.url)
+            e.description = f"Owns {owner.tags} tag{'s' if owner.tags != 1 else ''}, used {owner.uses} times in total"
+            if owner.top_tags:
+                e.add_field(name="Top tags", value="\n".join(
+                    f"{i}. {x['name']} ({x['uses'] or 0} uses)" for i, x in enumerate(owner.top_tags, start=1)
+                ), inline=False)
+            return await ctx.send(embed=e)
+
+        snapshot = await stats.snapshot()
+        e.title = "Tag leaderboard"
+        e.description = f"{snapshot.tags} tags, used {snapshot.uses} times in total"
+        if snapshot.top_tags:
+            e.add_field(name="Top tags", value="\n".join(
+                f"{i}. {x['name']} ({x['uses'] or 0} uses)" for i, x in enumerate(snapshot.top_tags, start=1)
+            ))
+        if snapshot.top_owners:
+            e.add_field(name="Top owners", value="\n".join(
+                f"{i}. <@{x['owner']}> ({x['uses']} uses, {x['tags']} tags)" for i, x in enumerate(snapshot.top_owners, start=1)
+            ))
+        if snapshot.recent:
+            e.add_field(name="Trending this week", value="\n".join(
+                f"{i}. {x['name']} ({x['uses']} uses)" for i, x in enumerate(snapshot.recent, start=1)
+            ), inline=False)
+        e.set_footer(text=f"Updated every {stats.ttl} seconds")
+        await ctx.send(embed=e)
     
     @tag.command(name="claim")
     async def tag_claim(self, ctx, name_or_id: str):
@@ -278,14 +347,19 @@ class Devision(commands.Cog):
 
     @tag.command(name="list")
     async def tag_list(self, ctx, member: discord.Member = None):
+        # each page is fetched as it's needed, starting after the last tag_id of the one before it
         if member:
-            tags = await self.bot.db.fetch("SELECT tag_id, name FROM tags WHERE owner_id = $1", member.id)
+            fetch = functools.partial(self.bot.queries.fetch, "legacy_tags.page_by_owner", member.id)
         else:
-            tags = await self.bot.db.fetch("SELECT tag_id, name FROM tags")
+            fetch = functools.partial(self.bot.queries.fetch, "legacy_tags.page")
+        source = KeysetPageSource(fetch,
+                                  key=lambda x: x['tag_id'],
+                                  format=lambda x: f"[**#{x['tag_id']}**] {x['name']}",
+                                  per_page=15,
+                                  start=0)
         pages = Paginator(ctx,
                           title=f"Tags by: {member}" if member else "All tags",
-                          entries=[f"[**#{x['tag_id']}**] {x['name']}" for x in tags],
-                          per_page=15)
+                          source=source)
         await pages.start()
 
     @tag.command(name="search")
@@ -293,7 +367,7 @@ class Devision(commands.Cog):
         if len(query) < 4:
             return await ctx.send("Search query must be at least 4 characters!")
 
-        tags = await self.bot.db.fetch("SELECT tag_id, name FROM tags WHERE SIMILARITY(name, $1) > 0.75 ORDER BY similarity(name, $1) DESC LIMIT 150", query)
+        tags = await self.bot.queries.fetch("legacy_tags.search", query)
         pages = Paginator(ctx,
                           entries=[f"[**#{x['tag_id']}**] {x['name']}" for x in tags],
                           show_entry_num=True,
@@ -306,15 +380,13 @@ class Devision(commands.Cog):
         data = await self.get_tag_data(ctx, name_or_id)
         if not data:
             return
-        if data.get('alias'):
-            data = await self.get_tag_data(ctx, data['alias'])
         if data['owner_id'] != ctx.author.id:
             return await ctx.send("You do not own this tag!")
 
         clean_content = discord.utils.escape_mentions(new_content)
         if len(clean_content) == 0 or len(clean_content) > 2000:
             return await ctx.send("Tag content must be between 0-2000 characters!")
-        await self.bot.db.execute("UPDATE tags SET content = $2 WHERE name = $1", data['name'], clean_content)
+        await self.bot.queries.execute("legacy_tags.edit", data['name'], clean_content)
         await ctx.send("Tag was successfully edited!")
 
     @tag.command(name="alias")
@@ -330,11 +402,11 @@ class Devision(commands.Cog):
             data = await self.get_tag_data(ctx, original)
 
         name = discord.utils.escape_mentions(alias)
-        check = await self.bot.db.fetchval("SELECT tag_id FROM tags WHERE LOWER(name) = $1", name.lower())
+        check = await self.bot.queries.fetchval("legacy_tags.id_by_lower_name", name.lower())
         if check:
             return await ctx.send("A tag with that name already exists!")
 
-        check2 = await self.bot.db.fetchval("SELECT tag_id FROM tags WHERE LOWER(name) = $1", data['name'].lower())
+        check2 = await self.bot.queries.fetchval("legacy_tags.id_by_lower_name", data['name'].lower())
         if not check2:
             return await ctx.send("A tag with that name doesn't exist!")
 
@@ -345,7 +417,7 @@ class Devision(commands.Cog):
         if name.isdigit():
             return await ctx.send("Tag names may not be numerical only!")
 
-        await self.bot.db.execute("INSERT INTO tags VALUES($1, $2, $3, $4, $5)", name, None, ctx.author.id, int(time.time()), data['name'])
+        await self.bot.queries.execute("legacy_tags.create_alias", name, None, ctx.author.id, int(time.time()), data['name'])
         if original:
             await ctx.send(f"Alias **{name}** is now pointing to **{data['name']}**! ***{original}** is an alias of that tag, so its being pointed to the original*")
         else:
@@ -356,7 +428,7 @@ class Devision(commands.Cog):
         rc = self.bot.get_channel(881226123478974484)
 
         if member.bot:
-            data = await self.bot.db.fetchrow("DELETE FROM bots WHERE bot_id = $1 RETURNING *", member.id)
+            data = await self.bot.queries.fetchrow("bots.delete", member.id)
             if not data:
                 return
 
@@ -371,7 +443,7 @@ class Devision(commands.Cog):
         else:
             async with self.bot.db.acquire() as conn:
                 async with conn.transaction(): # if something fucks up, roll back the deletion
-                    bots = await conn.fetch("DELETE FROM bots WHERE owner_id = $1 RETURNING *", member.id)
+                    bots = await self.bot.queries.fetch("bots.delete_by_owner", member.id, conn=conn)
                     if not bots:
                         return
 
@@ -404,7 +476,7 @@ class Devision(commands.Cog):
         rc = self.bot.get_channel(881226123478974484)
 
         try:
-            data = await self.bot.db.fetchrow("UPDATE bots SET date_add = $1 WHERE bot_id = $2 RETURNING *", int(time.time()), member.id)
+            data = await self.bot.queries.fetchrow("bots.mark_added", int(time.time()), member.id)
         except:
             data = None
 
@@ -444,7 +516,7 @@ class Devision(commands.Cog):
         if not bot.bot:
             return await ctx.send("That is a user, not a bot!", ephemeral=True)
 
-        data = await self.bot.db.fetchrow("SELECT * FROM bots WHERE bot_id = $1", bot.id)
+        data = await self.bot.queries.fetchrow("bots.get", bot.id)
         if not data:
             return await ctx.send("It seems the bot you requested is not stored in my database yet. This bot was probably added before this system was created...", ephemeral=True)
 
@@ -479,7 +551,7 @@ class Devision(commands.Cog):
         if ctx.guild.get_member(int(bot_id)):
             return await ctx.send("This bot is already in the server.", ephemeral=True)
 
-        if await self.bot.db.fetchrow("SELECT 1 FROM bots WHERE bot_id = $1", user.id):
+        if await self.bot.queries.fetchrow("bots.exists", user.id):
             return await ctx.send("This bot is already pending.", ephemeral=True)
 
         channel = self.bot.get_channel(881226123478974484)
@@ -489,25 +561,51 @@ class Devision(commands.Cog):
         v = ui.View()
         v.add_item(ui.Button(label="Invite", url=discord.utils.oauth_url(bot_id, permissions=discord.Permissions.none(), guild=ctx.guild), style=discord.ButtonStyle.link))
         msg = await channel.send(embed=e, view=v)
-        await self.bot.db.execute("INSERT INTO bots VALUES($1, $2, $3, $4, $5, $6)", int(bot_id), ctx.author.id, reason, None, int(time.time()), msg.id)
+        await self.bot.queries.execute("bots.create", int(bot_id), ctx.author.id, reason, None, int(time.time()), msg.id)
 
         await ctx.send("You bot has been submitted, you'll be notified when it's added to the server. Be sure to allow DMs from me!", ephemeral=True)
 
 
-    @commands.group(slash_command=True)
+    @commands.group()
     async def rtfm(self, ctx):
         """Search the docs for edpy or py"""
         pass
 
-    @rtfm.command(slash_command=True)
+    @rtfm.command()
     async def py(self, ctx, search: str = commands.Option(description="Item to search for")):
         """Search the Python docs"""
         await self.do_rtfm(ctx, 'python', search)
 
-    @rtfm.command(slash_command=True)
+    @rtfm.command()
     async def edpy(self, ctx, search: str = commands.Option(description="Item to search for")):
         """Search the Enhanced-dpy docs"""
         await self.do_rtfm(ctx, 'enhanced-dpy', search)
+
+    @rtfm.command()
+    async def docs(self, ctx, project: str = commands.Option(description="The docs to search"), *, search: str = commands.Option(description="Item to search for")):
+        """Search any of the docs we know about"""
+        await self.do_rtfm(ctx, project.lower(), search)
+
+    @commands.is_owner()
+    @rtfm.command(name="memory")
+    async def rtfm_memory(self, ctx):
+        """Show how much memory each loaded docs set uses"""
+        lines = [f"`{key}`: {len(index)} entries, {index.memory / 1024 / 1024:.2f} MiB" for key, index in self.rtfm.items()]
+        lines.append(f"**Total:** {self.rtfm.usage / 1024 / 1024:.2f} / {self.rtfm.budget / 1024 / 1024:.0f} MiB, {len(self.rtfm)}/{len(self.rtfm_pages)} docs loaded")
+        await ctx.send("\n".join(lines))
+
+    @commands.is_owner()
+    @rtfm.command(name="stats")
+    async def rtfm_stats(self, ctx):
+        """Show how well the rtfm result cache is doing"""
+        cache = self.rtfm_results
+        await ctx.send(
+            f"**Cached results:** {len(cache)}/{cache.maxsize}\n"
+            f"**Hits:** {cache.hits}\n"
+            f"**Misses:** {cache.misses}\n"
+            f"**Evictions:** {cache.evictions}\n"
+            f"**Hit rate:** {cache.hit_rate:.1%}"
+        )
         
     @commands.command(slash_command=True, slash_command_guilds=[514232441498763279], name='test')
     async def testslash(self, ctx):
@@ -520,5 +618,46 @@ class Devision(commands.Cog):
         md.add_item(Field(label="Reason"))
         await ctx.interaction.response.send_modal(md)
 
+
+class rtfmSearch(discord.SlashCommand, name="rtfm", guilds=[514232441498763279]):
+    """
+    Search the docs
+    """
+    docs: str = discord.Option(description="The docs to search", autocomplete=True)
+    search: str = discord.Option(description="Item to search for", autocomplete=True)
+
+    async def autocomplete(self, options, focused):
+        cog = self.client.get_cog("Devision")
+        if focused == "docs":
+            query = str(options[focused]).lower()
+            return discord.AutoCompleteResponse({k: k for k in cog.rtfm_pages if query in k})
+
+        key = str(options.get("docs") or "python").lower()
+        if key not in cog.rtfm_pages:
+            return discord.AutoCompleteResponse({})
+
+        names = await cog.rtfm_suggestions(self.interaction.user.id, key, str(options[focused]))
+        # choices are capped at 100 characters
+        return discord.AutoCompleteResponse({n[:100]: n[:100] for n in names})
+
+    async def callback(self) -> None:
+        cog = self.client.get_cog("Devision")
+        key = self.docs.lower()
+        if key not in cog.rtfm_pages:
+            return await self.send(f"I don't know those docs. Try one of: {', '.join(cog.rtfm_pages)}", ephemeral=True)
+
+        index = cog.rtfm.get(key)
+        if index is None:
+            await self.interaction.response.defer()
+            index = await asyncio.shield(cog.refresh_rtfm(key))
+
+        obj, matches = cog.rtfm_lookup(key, index, self.search)
+        if not matches:
+            return await self.send("Could not find anything. Sorry.")
+
+        await self.send(embed=cog.rtfm_embed(self.interaction.guild, key, obj, matches))
+
+
 def setup(bot):
-    bot.add_cog(Devision(bot))
\ No newline at end of file
+    bot.add_cog(Devision(bot))
+    bot.application_command(rtfmSearch)
\ No newline at end of file
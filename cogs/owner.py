@@ -1,8 +1,12 @@
+import datetime
 import inspect
+import os
+import tempfile
 
 import discord
 
 from discord.ext import commands
+from utils.tagtransfer import EXPORT_QUERIES, export_tags, import_tags, reserved_names
 
 rules = [
     (
@@ -72,6 +76,65 @@ class Owner(commands.Cog):
         for i, rule in enumerate(rules):
             await rulechan.send(f"**{i+1}. {rule[0]}**\n{inspect.cleandoc(rule[1])}")
 
+    @commands.is_owner()
+    @commands.command()
+    async def dbstats(self, ctx):
+        """Show how often each prepared statement ran, and how long it took"""
+        stats = sorted(self.bot.queries.stats.items(), key=lambda item: item[1].total, reverse=True)
+        lines = [
+            f"{name:<28} {s.calls:>7} {s.average * 1000:>8.2f}ms {s.slowest * 1000:>8.2f}ms"
+            for name, s in stats if s.calls
+        ]
+        if not lines:
+            return await ctx.send("No queries have run yet.")
+
+        header = f"{'statement':<28} {'calls':>7} {'avg':>10} {'slowest':>10}"
+        await ctx.send("```\n" + "\n".join([header, *lines])[:1980] + "\n```")
+
+    @commands.is_owner()
+    @commands.command()
+    async def tagexport(self, ctx, source: str = "tags"):
+        """Export every tag as NDJSON, from tags_new ("tags") or the legacy table ("legacy")"""
+        if source not in EXPORT_QUERIES:
+            return await ctx.send(f"Source must be one of: {', '.join(EXPORT_QUERIES)}")
+
+        # straight from COPY to disk, the export is never held in memory
+        with tempfile.NamedTemporaryFile(suffix=".ndjson") as f:
+            async with self.bot.db.acquire() as conn:
+                await export_tags(conn, f.name, source=source)
+
+            size = os.path.getsize(f.name)
+            limit = ctx.guild.filesize_limit if ctx.guild else 8 * 1024 * 1024
+            if size > limit:
+                return await ctx.send(
+                    f"The export is {size / 1024 / 1024:.1f} MiB, too big to upload here. "
+                    "Run `python -m utils.tagtransfer export` on the server instead."
+                )
+
+            await ctx.send(file=discord.File(f.name, filename=f"{source}-{datetime.date.today()}.ndjson"))
+
+    @commands.is_owner()
+    @commands.command()
+    async def tagimport(self, ctx):
+        """Import the NDJSON tags attached to the message into tags_new"""
+        if not ctx.message.attachments:
+            return await ctx.send("Attach an NDJSON file, as written by tagexport")
+
+        # the same names /tag-add refuses
+        reserved = reserved_names(self.bot.get_command("tag"))
+
+        status = await ctx.send("Importing...")
+
+        async def progress(result):
+            await status.edit(content=f"Importing... {result.lines} lines read, {result.invalid} invalid")
+
+        async with self.bot.session.get(ctx.message.attachments[0].url) as resp:
+            resp.raise_for_status()
+            async with self.bot.db.acquire() as conn:
+                result = await import_tags(conn, resp.content, reserved=reserved, progress=progress)
+
+        await status.edit(content=result.summary()[:2000])
+
 
 def setup(bot):
     bot.add_cog(Owner(bot))
\ No newline at end of file
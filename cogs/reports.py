@@ -5,25 +5,44 @@ import datetime
 
 import discord
 from discord import ui
-from typing import TYPE_CHECKING, Tuple, Optional, Union
+from typing import TYPE_CHECKING, Dict, Tuple, Optional, Union
 
 if TYPE_CHECKING:
     from bot import Alfred
+    from utils.timers import Timer
 
 def setup(bot: Alfred) -> None:
     bot.application_command(reportUser)
     bot.application_command(reportMessage)
 
+    incidents = IncidentRegistry(bot)
+    bot.report_coalescer = ReportCoalescer(bot)
+
+    bot.outbox.handler("incident.close")(close_incident)
+    bot.outbox.handler("incident.notify")(notify_user)
+    bot.outbox.handler("incident.log")(log_action)
+    for action in PUNISHMENTS:
+        bot.outbox.handler(f"incident.{action}")(punish_user)
+    bot.timers.action("incident.timeout_end")(end_timeout)
+
     @bot.listen()
     async def on_setup():
-        data = await bot.db.fetch("SELECT * FROM modreports WHERE mod IS NULL;")
-        for d in data:
-            bot.add_view(
-                IncidentView(d['id'], d['target'], bot.get_channel(947000488145076296).get_partial_message(d['reportMessage']), bot),
-                message_id=d['reportMessage']
-            )
+        await incidents.load()
+        bot.loop.create_task(replay_outbox())
+
+    async def replay_outbox():
+        # the effects need the guild and channel caches
+        await bot.wait_until_ready()
+        await bot.outbox.replay()
+
+    @bot.listen()
+    async def on_interaction(interaction: discord.Interaction):
+        incidents.dispatch(interaction)
 
 REPORT_CHANNEL = 947000488145076296
+MOD_INPUT_TIMEOUT = 120  # seconds a mod has to fill in the ModInput modal
+TIMEOUT_HOURS = 24  # "report_timeout_hours" in config.json
+COALESCE_WINDOW = 300  # seconds, "report_coalesce_seconds" in config.json
 NATLANG = {
     "warn": "You have been warned for the following reason:\n{reason}",
     "timeout": "You have received a timeout until {timeoutexp} for the following reason:\n{reason}",
@@ -38,77 +57,107 @@ PAST = {
     "ban": "banned"
 }
 
-class IncidentView(ui.View):
-    def __init__(self, incident_id: int, user_id: int, msg: Union[discord.PartialMessage, discord.Message], bot: Alfred) -> None:
-        super().__init__(timeout=None)
-        self.incident_id = incident_id
-        self.target_id = user_id
-        self.msg = msg
-        self.bot = bot
+class IncidentRegistry:
+    """
+    The open incidents from before the last restart, by report message id.
 
-    async def upgrade_message(self):
-        if isinstance(self.msg, discord.PartialMessage):
-            self.msg = await self.msg.fetch()
+    Their IncidentViews are only built when someone first presses a button on one of them, rather than
+    one per open report at startup. After that, the view is registered with the bot like any other.
+    """
 
-    async def get_mod_input(self, inter: discord.Interaction) -> Optional[Tuple[str, str]]:
-        waiter = asyncio.Future()
-        modal = ModInput(waiter)
-        await inter.response.send_modal(modal)
+    def __init__(self, bot: Alfred) -> None:
+        self.bot = bot
+        self._incidents: Dict[int, Tuple[int, int]] = {}  # message id -> (incident id, target id)
 
-        timeout = asyncio.sleep(120)
-        done, waiting = await asyncio.wait([timeout, waiter], return_when=asyncio.FIRST_COMPLETED)
+    async def load(self) -> None:
+        async with self.bot.db.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                async for row in self.bot.queries.cursor("reports.open", conn=conn, prefetch=500):
+                    self._incidents[row['reportmessage']] = (row['id'], row['target'])
 
-        for wait in waiting:
-            wait.cancel()
+        print(f"[REPORTS] {len(self._incidents)} open incidents")
 
-        if waiter.cancelled():
-            return None
+    def dispatch(self, interaction: discord.Interaction) -> None:
+        if interaction.type is not discord.InteractionType.component or interaction.message is None:
+            return
 
-        return waiter.result()
+        incident = self._incidents.pop(interaction.message.id, None)
+        if incident is None:
+            return
 
-    async def update_db(self, mod: int, action: str, remarks: Optional[str], response: Optional[str]) -> None:
-        query = "UPDATE modreports SET mod = $1, modAction = $2, modRemarks = $3, modResponse = $4 WHERE id = $5"
+        view = IncidentView(*incident, interaction.message, self.bot)
+        self.bot.add_view(view, message_id=interaction.message.id)
 
-        await self.bot.db.execute(query, mod, action, remarks, response, self.incident_id)
+        # the bot had nothing to hand this press to when it came in, so it's passed on by hand
+        custom_id = interaction.data.get('custom_id')
+        for item in view.children:
+            if getattr(item, 'custom_id', None) == custom_id:
+                view._dispatch_item(item, interaction)
+                break
 
-    async def invalidate_view(self, mod: discord.User, remarks: Optional[str], action: str) -> None:
-        for item in self.children:
-            item.disabled = True
 
-        await self.upgrade_message()
-        time = discord.utils.format_dt(discord.utils.utcnow(), style="f")
-        text = f"update at {time} - {mod.mention} ({mod} {mod.id}) has responded to this incident with action {action}\n"
-        if remarks:
-            text += "".join([f"> {x}\n" for x in remarks.replace("\n\n", "\n").splitlines(False)]) + "\n"
+class IncidentView(ui.View):
+    def __init__(self, incident_id: int, user_id: int, msg: Optional[Union[discord.PartialMessage, discord.Message]], bot: Alfred) -> None:
+        super().__init__(timeout=None)
+        self.incident_id = incident_id
+        self.target_id = user_id
+        self.msg = msg
+        self.bot = bot
 
-        text += self.msg.content
+    async def get_mod_input(self, inter: discord.Interaction) -> Optional[Tuple[discord.Interaction, str, str]]:
+        waiter = asyncio.Future()
+        modal = ModInput(waiter)
+        await inter.response.send_modal(modal)
 
-        await self.msg.edit(content=text, view=self)
+        timer = self.bot.timers.call_later(MOD_INPUT_TIMEOUT, ModInput.expire, waiter)
+        result = await waiter
+        timer.cancel()
+        return result
+
+    async def resolve(self, inter: discord.Interaction, action: str, remarks: Optional[str], response: Optional[str], **extra) -> None:
+        """
+        Records the mod's decision, and everything that follows from it, in one transaction. The
+        discord side of it then runs concurrently, and is retried from the outbox if that gets cut short.
+
+        ``inter`` has already been deferred, the outcome is sent to the mod as an ephemeral followup.
+        """
+        mod = inter.user
+        effects = [("incident.close", {
+            "incident": self.incident_id, "target": self.target_id, "message": self.msg.id,
+            "mod": str(mod), "mod_id": mod.id, "action": action, "remarks": remarks
+        })]
+        if action != "ignore":
+            effects.append(("incident.log", {"user": self.target_id, "action": action, "reason": response, "mod": str(mod), "mod_id": mod.id}))
+            notice = {"user": self.target_id, "action": action, "reason": response, **extra}
+            # a punishment DMs them itself, before it's carried out
+            effects.append((f"incident.{action}" if action in PUNISHMENTS else "incident.notify", notice))
+
+        scheduled = None
+        async with self.bot.db.acquire() as conn:
+            async with conn.transaction():
+                resolved = await self.bot.queries.fetchval("reports.resolve", mod.id, action, remarks, response, self.incident_id, conn=conn)
+                if resolved:
+                    jobs = await self.bot.outbox.add(effects, conn=conn)
+                    if action == "timeout":
+                        until = datetime.datetime.fromisoformat(extra['until']).astimezone(datetime.timezone.utc).replace(tzinfo=None)
+                        scheduled = await self.bot.timers.schedule(
+                            "incident.timeout_end", until, {"incident": self.incident_id, "user": self.target_id}, conn=conn
+                        )
+
+        if not resolved:
+            return await inter.followup.send("Someone else has already responded to this incident", ephemeral=True)
+
+        if scheduled:
+            self.bot.timers.add(scheduled)
+        self.bot.report_coalescer.discard(self.incident_id)
         self.stop()
-
-    async def send_to_user(self, action: str, reason: str, timeoutexp: Optional[str]=None) -> bool:
-        user = self.bot.get_user(self.target_id)
-        if not user:
-            return False
-
-        msg = NATLANG[action].format(reason=reason, timeoutexp=timeoutexp)
-        try:
-            await user.send(msg)
-            return True
-        except:
-            return False
-
-    async def send_to_actions_channel(self, action: str, reason: str, mod: discord.User) -> None:
-        actions_channel = self.bot.get_channel(892559499385270272)
-        user = await self.bot.try_user(self.target_id)
-
-        text = f"{mod.mention} ({mod} {mod.id}) {PAST[action]} {user.mention} ({user} {user.id}) {'for one day' if action == 'timeout' else ''} for {reason}. "
-        await actions_channel.send(text)
+        await inter.followup.send(f"Incident closed: {action}", ephemeral=True)
+        await self.bot.outbox.run(jobs)
 
     @ui.button(label="Ignore report", style=discord.ButtonStyle.blurple, custom_id="ignore")
     async def ignore(self, _, inter: discord.Interaction) -> None:
-        await self.update_db(inter.user.id, "ignore", None, None)
-        await self.invalidate_view(inter.user, None, "ignore")
+        await inter.response.defer()
+        await self.resolve(inter, "ignore", None, None)
 
     @ui.button(label="Warn user", style=discord.ButtonStyle.blurple, custom_id="warn")
     async def warn(self, _, inter: discord.Interaction) -> None:
@@ -121,12 +170,8 @@ class IncidentView(ui.View):
         if not mod_input:
             return
 
-        remarks, response = mod_input
-        await self.update_db(inter.user.id, "warn", remarks, response)
-        await self.invalidate_view(inter.user, remarks, "warn")
-        await self.send_to_user("warn", response)
-        await self.send_to_actions_channel("warn", response, inter.user)
-
+        submitted, remarks, response = mod_input
+        await self.resolve(submitted, "warn", remarks, response)
 
     @ui.button(label="Timeout user", style=discord.ButtonStyle.blurple, custom_id="timeout")
     async def timeout_(self, _, inter: discord.Interaction) -> None:
@@ -139,17 +184,10 @@ class IncidentView(ui.View):
         if not mod_input:
             return
 
-        remarks, response = mod_input
-
-        timeout_until = discord.utils.utcnow() + datetime.timedelta(days=1)
-        time = discord.utils.format_dt(timeout_until, style="f")
-
-        await self.update_db(inter.user.id, "timeout", remarks, response)
-        await self.invalidate_view(inter.user, remarks, "timeout")
-        await self.send_to_user("timeout", response, time)
-        await self.send_to_actions_channel("timeout", response, inter.user)
-
-        await user.edit(timeout_until=timeout_until)
+        submitted, remarks, response = mod_input
+        hours = self.bot.config.get("report_timeout_hours", TIMEOUT_HOURS)
+        timeout_until = discord.utils.utcnow() + datetime.timedelta(hours=hours)
+        await self.resolve(submitted, "timeout", remarks, response, until=timeout_until.isoformat(), hours=hours)
 
     @ui.button(label="Kick user", style=discord.ButtonStyle.blurple, custom_id="kick")
     async def kick(self, _, inter: discord.Interaction) -> None:
@@ -162,14 +200,8 @@ class IncidentView(ui.View):
         if not mod_input:
             return
 
-        remarks, response = mod_input
-
-        await self.update_db(inter.user.id, "kick", remarks, response)
-        await self.invalidate_view(inter.user, remarks, "kick")
-        await self.send_to_user("kick", response)
-        await self.send_to_actions_channel("kick", response, inter.user)
-
-        await user.kick()
+        submitted, remarks, response = mod_input
+        await self.resolve(submitted, "kick", remarks, response)
 
     @ui.button(label="Ban user", style=discord.ButtonStyle.danger, custom_id="ban")
     async def ban(self, _, inter: discord.Interaction) -> None:
@@ -177,14 +209,91 @@ class IncidentView(ui.View):
         if not mod_input:
             return
 
-        remarks, response = mod_input
+        submitted, remarks, response = mod_input
+        await self.resolve(submitted, "ban", remarks, response)
+
+
+# the outbox effects of IncidentView.resolve. Each one only gets ids and text, so it can be retried after a restart
+
+async def close_incident(bot: Alfred, data: dict) -> None:
+    msg = await bot.get_channel(REPORT_CHANNEL).fetch_message(data['message'])
+
+    view = IncidentView(data['incident'], data['target'], msg, bot)
+    for item in view.children:
+        item.disabled = True
+    view.stop()
+
+    time = discord.utils.format_dt(discord.utils.utcnow(), style="f")
+    text = f"update at {time} - <@{data['mod_id']}> ({data['mod']} {data['mod_id']}) has responded to this incident with action {data['action']}\n"
+    if remarks := data['remarks']:
+        text += "".join([f"> {x}\n" for x in remarks.replace("\n\n", "\n").splitlines(False)]) + "\n"
+
+    await msg.edit(content=text + msg.content, view=view)
 
-        await self.update_db(inter.user.id, "ban", remarks, response)
-        await self.invalidate_view(inter.user, remarks, "ban")
-        await self.send_to_user("ban", response)
-        await self.send_to_actions_channel("ban", response, inter.user)
 
-        await self.bot.get_guild(514232441498763279).ban(discord.Object(self.target_id))
+async def notify_user(bot: Alfred, data: dict) -> None:
+    user = bot.get_user(data['user'])
+    if not user:
+        return
+
+    until = data.get('until')
+    timeoutexp = until and discord.utils.format_dt(datetime.datetime.fromisoformat(until), style="f")
+    try:
+        await user.send(NATLANG[data['action']].format(reason=data['reason'], timeoutexp=timeoutexp))
+    except discord.HTTPException:
+        pass  # their DMs are closed, nothing to retry
+
+
+async def log_action(bot: Alfred, data: dict) -> None:
+    actions_channel = bot.get_channel(892559499385270272)
+    user = bot.get_user(data['user']) or await bot.fetch_user(data['user'])
+
+    duration = f"for {format_hours(data.get('hours', TIMEOUT_HOURS))}" if data['action'] == 'timeout' else ''
+    text = f"<@{data['mod_id']}> ({data['mod']} {data['mod_id']}) {PAST[data['action']]} {user.mention} ({user} {user.id}) {duration} for {data['reason']}. "
+    await actions_channel.send(text)
+
+
+async def end_timeout(bot: Alfred, data: dict) -> None:
+    # discord lifts the timeout by itself, this is so it's on record
+    actions_channel = bot.get_channel(892559499385270272)
+    await actions_channel.send(f"The timeout of <@{data['user']}> ({data['user']}) from incident {data['incident']} has ended.")
+
+
+def format_hours(hours: float) -> str:
+    if hours % 24 == 0:
+        days = int(hours // 24)
+        return "one day" if days == 1 else f"{days} days"
+    return "one hour" if hours == 1 else f"{hours:g} hours"
+
+
+async def timeout_user(bot: Alfred, data: dict) -> None:
+    member = bot.get_guild(514232441498763279).get_member(data['user'])
+    if member:
+        await member.edit(timeout_until=datetime.datetime.fromisoformat(data['until']))
+
+
+async def kick_user(bot: Alfred, data: dict) -> None:
+    member = bot.get_guild(514232441498763279).get_member(data['user'])
+    if member:
+        await member.kick()
+
+
+async def ban_user(bot: Alfred, data: dict) -> None:
+    await bot.get_guild(514232441498763279).ban(discord.Object(data['user']))
+
+
+PUNISHMENTS = {
+    "timeout": timeout_user,
+    "kick": kick_user,
+    "ban": ban_user,
+}
+
+
+async def punish_user(bot: Alfred, data: dict) -> None:
+    # the DM has to go first, once they're kicked or banned the bot may not share a server with them anymore.
+    # If the punishment fails, the retry DMs them again
+    await notify_user(bot, data)
+    await PUNISHMENTS[data['action']](bot, data)
 
 class ModInput(ui.Modal):
     def __init__(self, waiter: asyncio.Future):
@@ -206,9 +315,188 @@ class ModInput(ui.Modal):
             required=True
         ))
 
+    @staticmethod
+    def expire(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
     async def callback(self, interaction: discord.Interaction):
-        await interaction.response.send_message("Input received", ephemeral=True)
-        self.waiter.set_result((self.children[0].value, self.children[1].value))
+        if self.waiter.done():
+            return await interaction.response.send_message("This took too long, please press the button again", ephemeral=True)
+
+        # answered once the decision is recorded, see IncidentView.resolve
+        await interaction.response.defer(ephemeral=True)
+        self.waiter.set_result((interaction, self.children[0].value, self.children[1].value))
+
+
+class PendingIncident:
+    __slots__ = ("incident_id", "message", "time", "body", "reporters", "ready", "edit", "closed")
+
+    def __init__(self, ready: asyncio.Future) -> None:
+        self.ready = ready  # done once the incident has been posted, cancelled if that failed
+        self.incident_id: Optional[int] = None
+        self.message: Optional[discord.Message] = None
+        self.time: Optional[str] = None
+        self.body: Optional[str] = None
+        self.reporters = 1
+        self.edit: Optional[Timer] = None  # a pending edit of the reporter count
+        self.closed = False
+
+    def render(self) -> str:
+        header = f"> incident {self.incident_id} at {self.time}"
+        if self.reporters > 1:
+            header += f" - reported by {self.reporters} users"
+        return f"{header}\n{self.body}"
+
+
+class ReportCoalescer:
+    """
+    Folds reports against the same user or message into one incident for ``window`` seconds after the
+    first of them ("report_coalesce_seconds" in config.json, 0 turns it off).
+
+    The first report posts the incident, every later one is added to ``modreport_reporters`` and bumps
+    the reporter count in the incident message, which is edited at most once every ``EDIT_DELAY``
+    seconds. A placeholder goes into ``_pending`` before the first report's first await, so reports
+    that come in while it's being posted wait for it rather than posting their own.
+    """
+
+    EDIT_DELAY = 5
+
+    def __init__(self, bot: Alfred) -> None:
+        self.bot = bot
+        self.window = bot.config.get("report_coalesce_seconds", COALESCE_WINDOW)
+        self._pending: Dict[Tuple[str, int], PendingIncident] = {}  # ("user" or "message", id) -> its incident
+        self._incidents: Dict[int, Tuple[str, int]] = {}  # incident id -> key in _pending
+
+    async def report(
+        self,
+        interaction: discord.Interaction,
+        key: Tuple[str, int],
+        target_id: int,
+        reported: str,
+        remarks: str,
+        channel_id: Optional[int] = None,
+        message_id: Optional[int] = None
+    ) -> None:
+        await interaction.response.defer(ephemeral=True)
+        try:
+            await self._file(interaction, key, target_id, reported, remarks, channel_id, message_id)
+        except Exception:
+            await interaction.followup.send("Your report couldn't be sent, please try again in a bit.", ephemeral=True)
+            raise
+
+        await interaction.followup.send("Thank you for your report.", ephemeral=True)
+
+    async def _file(
+        self,
+        interaction: discord.Interaction,
+        key: Tuple[str, int],
+        target_id: int,
+        reported: str,
+        remarks: str,
+        channel_id: Optional[int],
+        message_id: Optional[int]
+    ) -> None:
+        while True:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = PendingIncident(self.bot.loop.create_future())
+                if self.window > 0:
+                    self._pending[key] = pending
+
+                try:
+                    await self._post(pending, interaction, target_id, reported, remarks, channel_id, message_id)
+                except BaseException:
+                    self._forget(key, pending)
+                    pending.ready.cancel()
+                    raise
+
+                pending.ready.set_result(None)
+                if self.window > 0:
+                    self._incidents[pending.incident_id] = key
+                    self.bot.timers.call_later(self.window, self._forget, key, pending)
+                break
+
+            try:
+                await asyncio.shield(pending.ready)
+            except asyncio.CancelledError:
+                if pending.ready.cancelled():
+                    continue  # posting it failed, so this report gets to try
+                raise
+
+            if pending.closed:
+                continue
+            await self._join(pending, interaction.user.id, remarks)
+            break
+
+    def discard(self, incident_id: int) -> None:
+        """Stops folding reports into an incident, once a mod has responded to it."""
+        key = self._incidents.get(incident_id)
+        if key is not None:
+            self._forget(key, self._pending[key])
+
+    def _forget(self, key: Tuple[str, int], pending: PendingIncident) -> None:
+        if self._pending.get(key) is pending:
+            del self._pending[key]
+        if pending.incident_id is not None:
+            self._incidents.pop(pending.incident_id, None)
+        pending.closed = True
+        if pending.edit:
+            pending.edit.cancel()
+
+    async def _post(
+        self,
+        pending: PendingIncident,
+        interaction: discord.Interaction,
+        target_id: int,
+        reported: str,
+        remarks: str,
+        channel_id: Optional[int],
+        message_id: Optional[int]
+    ) -> None:
+        # the report channel message goes out once, complete, so its id is taken before there's a row for it
+        pending.incident_id = await self.bot.queries.fetchval("reports.reserve_id")
+        pending.time = discord.utils.format_dt(discord.utils.utcnow(), style="f")
+        pending.body = f"<@&881250948910055424> {interaction.user.mention} ({interaction.user} {interaction.user.id}) has reported " \
+                       f"{reported}:\n\n>>> {remarks}"
+
+        view = IncidentView(pending.incident_id, target_id, None, self.bot)
+        view.msg = pending.message = await self.bot.get_channel(REPORT_CHANNEL).send(
+            pending.render(), view=view, allowed_mentions=discord.AllowedMentions(users=False, roles=True, everyone=False)
+        )
+
+        try:
+            await self.bot.queries.execute(
+                "reports.create",
+                pending.incident_id, interaction.user.id, target_id, remarks, channel_id, message_id, view.msg.id
+            )
+        except Exception:
+            # without its row, the buttons on it would only ever say someone else had responded
+            view.stop()
+            try:
+                await view.msg.delete()
+            except discord.HTTPException as e:
+                print(f"[REPORTS] Couldn't delete the message of unsaved incident {pending.incident_id}: {e!r}")
+            raise
+
+    async def _join(self, pending: PendingIncident, reporter: int, remarks: str) -> None:
+        added = await self.bot.queries.fetchval("reports.add_reporter", pending.incident_id, reporter, remarks)
+        if not added or pending.closed:
+            return  # they'd already reported it
+
+        pending.reporters += 1
+        if pending.edit is None:
+            pending.edit = self.bot.timers.call_later(self.EDIT_DELAY, self._edit, pending)
+
+    async def _edit(self, pending: PendingIncident) -> None:
+        pending.edit = None
+        if pending.closed:
+            return
+
+        try:
+            await pending.message.edit(content=pending.render())
+        except discord.HTTPException as e:
+            print(f"[REPORTS] Couldn't update the reporter count of incident {pending.incident_id}: {e!r}")
 
 
 class ReportUserModal(ui.Modal):
@@ -225,32 +513,10 @@ class ReportUserModal(ui.Modal):
         )
 
     async def callback(self, interaction: discord.Interaction) -> None:
-        text = f"<@&881250948910055424> {interaction.user.mention} ({interaction.user} {interaction.user.id}) has reported " \
-               f"{self.target.mention} ({self.target} {self.target.id}):\n\n>>> {self.children[0].value}"
-
-        channel = self.client.get_channel(REPORT_CHANNEL)
-        msg = await channel.send(text, allowed_mentions=discord.AllowedMentions(users=False, roles=True, everyone=False))
-
-        incident_id = await self.client.db.fetchval(
-            """
-            INSERT INTO modreports
-                (reporter, target, reportRemarks)
-            VALUES
-                ($1, $2, $3)
-            RETURNING id
-            """,
-            interaction.user.id, self.target.id, self.children[0].value
+        await self.client.report_coalescer.report(
+            interaction, ("user", self.target.id), self.target.id,
+            f"{self.target.mention} ({self.target} {self.target.id})", self.children[0].value
         )
-        time = discord.utils.format_dt(discord.utils.utcnow(), style="f")
-        text = f"> incident {incident_id} at {time}\n" \
-               f"<@&881250948910055424> {interaction.user.mention} ({interaction.user} {interaction.user.id}) has reported " \
-               f"{self.target.mention} ({self.target} {self.target.id}):\n\n>>> {self.children[0].value}"
-
-        msg = await msg.edit(content=text) # need to do this in two steps
-        view = IncidentView(incident_id, self.target.id, msg, self.client)
-        await msg.edit(content=text, view=view)
-
-        await interaction.response.send_message("Thank you for your report.", ephemeral=True)
 
 
 class ReportMessageModal(ui.Modal):
@@ -267,35 +533,12 @@ class ReportMessageModal(ui.Modal):
         )
 
     async def callback(self, interaction: discord.Interaction) -> None:
-        text = f"<@&881250948910055424> {interaction.user.mention} ({interaction.user} {interaction.user.id}) has reported " \
-               f"{self.target.jump_url}:\n\n>>> {self.children[0].value}"
-
-        channel = self.client.get_channel(REPORT_CHANNEL)
-        msg = await channel.send(text,
-                                 allowed_mentions=discord.AllowedMentions(users=False, roles=True, everyone=False))
-
-        incident_id = await self.client.db.fetchval(
-            """
-            INSERT INTO modreports
-                (reporter, target, reportRemarks, channel, message)
-            VALUES
-                ($1, $2, $3, $4, $5)
-            RETURNING id
-            """,
-            interaction.user.id, self.target.id, self.children[0].value, self.target.channel.id, self.target.id
+        await self.client.report_coalescer.report(
+            interaction, ("message", self.target.id), self.target.author.id,
+            f"<{self.target.jump_url}>", self.children[0].value,
+            channel_id=self.target.channel.id, message_id=self.target.id
         )
 
-        time = discord.utils.format_dt(discord.utils.utcnow(), style="f")
-        text = f"> incident {incident_id} at {time}\n" \
-               f"<@&881250948910055424> {interaction.user.mention} ({interaction.user} {interaction.user.id}) has reported " \
-               f"<{self.target.jump_url}>:\n\n>>> {self.children[0].value}"
-
-        msg = await msg.edit(content=text)  # need to do this in two steps
-        view = IncidentView(incident_id, self.target.author.id, msg, self.client)
-        await msg.edit(content=text, view=view)
-
-        await interaction.response.send_message("Thank you for your report.", ephemeral=True)
-
 
 class reportUser(discord.UserCommand, name="report", guilds=[514232441498763279]):
     """
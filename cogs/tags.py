@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import asyncpg
 import discord
-from typing import TYPE_CHECKING, Dict, Union, Optional
+from typing import TYPE_CHECKING, Dict, List, Union, Optional
+
+from utils.autocomplete import Superseding
 
 if TYPE_CHECKING:
     from bot import Alfred
@@ -14,30 +16,32 @@ def setup(bot: Alfred):
     bot.application_command(deleteTag)
     bot.application_command(infoTag)
     bot.application_command(editTag)
+    bot.application_command(searchTag)
 
 
 class AutoCompletableCommand(discord.SlashCommand):
     client: Alfred
 
+    # at most this long, prefixes are answered from the tag cache without asking the database
+    SHORT_PREFIX = 3
+    # keyed by user id, a newer keystroke cancels the older one
+    _suggesting = Superseding()
+
+    async def suggest(self, tag_query: str) -> List[str]:
+        cache = self.client.tag_cache
+        if cache.ready and len(tag_query) <= self.SHORT_PREFIX:
+            return cache.prefix(tag_query, 10)
+
+        # name % $1 is the indexable form of SIMILARITY(name, $1) > pg_trgm.similarity_threshold
+        tags = await self.client.queries.fetch("tags.similar", tag_query)
+        return [n["name"] for n in tags]
+
     async def autocomplete(
         self, options: Dict[str, Union[int, float, str]], focused: str
     ) -> discord.AutoCompleteResponse:
-        tag_query = options[focused]
-        query = """
-        SELECT
-            name
-        FROM
-            tag_lookup
-        WHERE
-            SIMILARITY(name, $1) > 0.25 
-        ORDER BY
-            similarity(name, $1) 
-            DESC
-            LIMIT 10
-        """
-
-        tags = await self.client.db.fetch(query, tag_query)
-        return discord.AutoCompleteResponse({n["name"]: n["name"] for n in tags})
+        query = str(options[focused]).strip().lower()
+        names = await self._suggesting.run(self.interaction.user.id, self.suggest(query), [])
+        return discord.AutoCompleteResponse({n: n for n in names})
 
 class tag(AutoCompletableCommand, guilds=[514232441498763279]):
     """
@@ -47,12 +51,18 @@ class tag(AutoCompletableCommand, guilds=[514232441498763279]):
     name: str = discord.Option(description="The tag to invoke", autocomplete=True)
 
     async def callback(self) -> None:
+        cache = self.client.tag_cache
+        if cache.ready:
+            tag = cache.get(self.name)
+        else:
+            # the cache is still (re)loading, ask the database instead
+            tag = await self.client.queries.fetchrow("tags.lookup", self.name)
 
-        data = await self.client.db.fetchrow("SELECT findTag($1)", self.name)
-        if not data['findtag']:
+        if not tag:
             return await self.send("That tag does not exist", ephemeral=True)
 
-        await self.send(data['findtag'][1])
+        self.client.tag_usage.record(tag[0], self.interaction.user.id, self.interaction.channel_id)
+        await self.send(tag[2])
 
 
 class TagAddModal(discord.ui.Modal):
@@ -77,9 +87,8 @@ class TagAddModal(discord.ui.Modal):
 
         content = discord.utils.escape_mentions(content.strip())
 
-        query = "SELECT createTag($1, $2, $3)"
         try:
-            await self.client.db.execute(query, name, content, interaction.user.id) # type: ignore
+            await self.client.queries.execute("tags.create", name, content, interaction.user.id) # type: ignore
         except asyncpg.UniqueViolationError:
             return await interaction.response.send_message("Tag already exists", ephemeral=True)
 
@@ -108,8 +117,8 @@ class addTag(discord.SlashCommand, name="tag-add", guilds=[514232441498763279]):
             return await self.send("Content must be 2000 characters or less")
 
         try:
-            await self.client.db.execute(
-                "SELECT createTag($1, $2, $3)",
+            await self.client.queries.execute(
+                "tags.create",
                 self.name, content, self.interaction.user.id
             )
         except asyncpg.UniqueViolationError:
@@ -131,7 +140,7 @@ class aliasTag(AutoCompletableCommand, name="tag-alias", guilds=[514232441498763
             return await self.send("Invalid alias name", ephemeral=True)
 
         try:
-            resp = await self.client.db.fetchrow("SELECT createAlias($1, $2)", self.tag_name, alias)
+            resp = await self.client.queries.fetchrow("tags.alias", self.tag_name, alias)
             await self.send(resp['createalias'])
         except asyncpg.UniqueViolationError:
             await self.send("A tag/alias with that name already exists")
@@ -148,7 +157,7 @@ class deleteTag(discord.SlashCommand, name="tag-delete", guilds=[514232441498763
     async def callback(self) -> None:
         name = self.name.strip().lower()
 
-        resp = await self.client.db.fetchrow("SELECT deleteTag($1, $2)", name, self.interaction.user.id)
+        resp = await self.client.queries.fetchrow("tags.delete", name, self.interaction.user.id)
         await self.send(resp['deletetag'])
 
 
@@ -160,15 +169,7 @@ class infoTag(AutoCompletableCommand, name="tag-info", guilds=[51423244149876327
 
     async def callback(self) -> None:
         name = self.name.strip().lower()
-        query = """
-        SELECT
-            tl.tagId, tl.isAlias, tn.name, tn.owner, tn.uses, tn.created
-        FROM tag_lookup tl
-        INNER JOIN tags_new tn ON tn.id = tl.tagId
-        WHERE tl.name = $1
-        """
-
-        lookup = await self.client.db.fetchrow(query, name)
+        lookup = await self.client.queries.fetchrow("tags.info", name)
         if not lookup:
             return await self.send("Tag not found", ephemeral=True)
 
@@ -203,14 +204,7 @@ class TagEditModal(discord.ui.Modal):
         ))
 
     async def callback(self, interaction: discord.Interaction):
-        query = """
-        UPDATE tags_new
-        SET
-            content = $1
-        WHERE
-            id = $2
-        """
-        await self.client.db.execute(query, self.children[0].value, self.tag) # type: ignore
+        await self.client.queries.execute("tags.edit", self.children[0].value, self.tag) # type: ignore
         await interaction.response.send_message("Updated tag", ephemeral=True)
 
 class editTag(AutoCompletableCommand, name="tag-edit", guilds=[514232441498763279]):
@@ -219,15 +213,7 @@ class editTag(AutoCompletableCommand, name="tag-edit", guilds=[51423244149876327
 
     async def callback(self) -> None:
         name = self.name.strip().lower()
-        query = """
-                SELECT
-                    tl.tagId, tn.owner
-                FROM tag_lookup tl
-                INNER JOIN tags_new tn ON tn.id = tl.tagId
-                WHERE tl.name = $1
-                """
-
-        lookup = await self.client.db.fetchrow(query, name)
+        lookup = await self.client.queries.fetchrow("tags.owner", name)
         if not lookup:
             return await self.send("Tag not found", ephemeral=True)
 
@@ -237,12 +223,25 @@ class editTag(AutoCompletableCommand, name="tag-edit", guilds=[51423244149876327
         if not self.content:
             return await self.interaction.response.send_modal(TagEditModal(lookup['tagid'], self.client))
 
-        query = """
-        UPDATE tags_new
-        SET
-            content = $1
-        WHERE
-            id = $2
-        """
-        await self.client.db.execute(query, self.content, lookup['tagid']) # type: ignore
-        await self.send("Updated tag", ephemeral=True)
\ No newline at end of file
+        await self.client.queries.execute("tags.edit", self.content, lookup['tagid']) # type: ignore
+        await self.send("Updated tag", ephemeral=True)
+
+
+class searchTag(discord.SlashCommand, name="tag-search", guilds=[514232441498763279]):
+    """
+    Searches the content of tags
+    """
+    query: str = discord.Option(description="Words the tag says, e.g. \"install from github\"")
+
+    client: Alfred
+
+    async def callback(self) -> None:
+        results = await self.client.queries.fetch("tags.search", self.query, 10)
+        if not results:
+            return await self.send("No tags mention that", ephemeral=True)
+
+        e = discord.Embed(title=f"Tags mentioning {discord.utils.escape_markdown(self.query)[:200]}")
+        for tag_id, name, snippet in results:
+            e.add_field(name=name, value=snippet.replace("\n", " ")[:1024] or "\u200b", inline=False)
+
+        await self.send(embed=e)
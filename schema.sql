@@ -14,6 +14,36 @@ CREATE TABLE modreports (
     modRemarks TEXT,
     modResponse TEXT
 );
+-- the open reports are read at startup, to put their buttons back
+CREATE INDEX modreports_open_idx ON modreports (id) INCLUDE (target, reportMessage) WHERE mod IS NULL;
+
+-- everyone who reported an incident, reports against the same target in a short window are folded into one
+CREATE TABLE modreport_reporters (
+    incident INT NOT NULL REFERENCES modreports(id),
+    reporter BIGINT NOT NULL,
+    remarks TEXT,
+    reported TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc'),
+    PRIMARY KEY (incident, reporter)
+);
+
+-- discord side effects of a change, written in the same transaction and deleted once they've run (utils/outbox.py)
+CREATE TABLE outbox (
+    id SERIAL PRIMARY KEY,
+    effect TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    attempts INT NOT NULL DEFAULT 0,
+    created TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc')
+);
+
+-- things the bot has to do at a later time, e.g. when a timeout ends (utils/timers.py)
+CREATE TABLE scheduled_actions (
+    id SERIAL PRIMARY KEY,
+    action TEXT NOT NULL,
+    due TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    payload JSONB NOT NULL,
+    attempts INT NOT NULL DEFAULT 0
+);
+CREATE INDEX scheduled_actions_due_idx ON scheduled_actions (due);
 CREATE TABLE tags_new (
     id SERIAL UNIQUE,
     name TEXT NOT NULL CHECK (char_length(name) <= 32),
@@ -21,14 +51,23 @@ CREATE TABLE tags_new (
     content TEXT NOT NULL CHECK (char_length(content) <= 2000),
     owner BIGINT NOT NULL,
     uses INT DEFAULT 0,
-    created TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc')
+    created TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (NOW() AT TIME ZONE 'utc'),
+    -- for /tag-search, a match in the name counts for more than one in the content
+    search TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', name), 'A') || setweight(to_tsvector('english', content), 'B')
+    ) STORED
 );
+CREATE INDEX tags_new_search_idx ON tags_new USING GIN (search);
 CREATE TABLE tag_lookup (
     name TEXT PRIMARY KEY CHECK (char_length(name) <= 32),
     tagId INT NOT NULL REFERENCES tags_new(id),
     isAlias BOOLEAN NOT NULL
 );
 
+-- tag autocomplete filters with `name % $1`, the bot sets pg_trgm.similarity_threshold on its connections
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX tag_lookup_name_trgm_idx ON tag_lookup USING GIN (name gin_trgm_ops);
+
 CREATE FUNCTION isTagOwner(tagID_ INTEGER, requester BIGINT)
     RETURNS BOOLEAN
     LANGUAGE plpgsql
@@ -48,33 +87,18 @@ CREATE FUNCTION isTagOwner(tagID_ INTEGER, requester BIGINT)
     END
     $$;
 
-CREATE FUNCTION findTag(givenName TEXT)
-    RETURNS TEXT[] -- [name, content]
-    LANGUAGE plpgsql
+-- read only, uses are counted by the bot and written back in batches
+CREATE FUNCTION lookupTag(givenName TEXT)
+    RETURNS TABLE (tagId INT, tagName TEXT, tagContent TEXT)
+    LANGUAGE sql
+    STABLE
     AS
     $$
-    DECLARE
-        tagID_ INT;
-        tagName TEXT;
-        tagContent TEXT;
-    BEGIN
-        SELECT tagId
-            INTO tagID_
-            FROM tag_lookup
-            WHERE name = givenName;
-
-        IF tagID_ IS NULL
-            THEN RETURN NULL;
-        END IF;
-
-        UPDATE tags_new
-            SET uses = uses + 1
-            WHERE id = tagID_
-            RETURNING name, content
-                INTO tagName, tagContent;
-
-        RETURN ARRAY[tagName, tagContent];
-    END
+        SELECT
+            tn.id, tn.name, tn.content
+            FROM tag_lookup tl
+            INNER JOIN tags_new tn ON tn.id = tl.tagId
+            WHERE tl.name = givenName;
     $$;
 
 CREATE FUNCTION createTag (tag_name TEXT, tag_content TEXT, tag_owner BIGINT)
@@ -158,4 +182,113 @@ CREATE FUNCTION deleteTag (tagName TEXT, requester BIGINT)
                 RETURN 'Tag alias deleted';
         END IF;
     END
-    $$;
\ No newline at end of file
+    $$;
+-- the bot keeps an in-memory copy of the tags, these tell it what changed
+CREATE FUNCTION notifyTagChange()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql
+    AS
+    $$
+    BEGIN
+        -- a bulk import (utils/tagtransfer.py) sends a single RELOAD once it's done instead
+        IF (current_setting('alfred.bulk_import', true) = 'on') THEN
+            RETURN NULL;
+        END IF;
+
+        IF (TG_TABLE_NAME = 'tags_new') THEN
+            IF (TG_OP = 'DELETE')
+                THEN PERFORM pg_notify('tag_changes', json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', OLD.id)::TEXT);
+                ELSE PERFORM pg_notify('tag_changes', json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'id', NEW.id)::TEXT);
+            END IF;
+        ELSE
+            IF (TG_OP = 'DELETE')
+                THEN PERFORM pg_notify('tag_changes', json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'name', OLD.name)::TEXT);
+            ELSIF (TG_OP = 'UPDATE')
+                THEN PERFORM pg_notify('tag_changes', json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'name', NEW.name, 'old_name', OLD.name)::TEXT);
+                ELSE PERFORM pg_notify('tag_changes', json_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'name', NEW.name)::TEXT);
+            END IF;
+        END IF;
+        RETURN NULL;
+    END
+    $$;
+
+CREATE TRIGGER tagsNewChanged
+    AFTER INSERT OR DELETE OR UPDATE OF name, content ON tags_new
+    FOR EACH ROW EXECUTE FUNCTION notifyTagChange();
+
+CREATE TRIGGER tagLookupChanged
+    AFTER INSERT OR UPDATE OR DELETE ON tag_lookup
+    FOR EACH ROW EXECUTE FUNCTION notifyTagChange();
+
+-- tag stats. tags_new.uses, tag_stats_owners.uses, tag_stats_daily and tag_usage_hourly are all bumped by the bot's
+-- usage flush (tags.add_uses), tag_stats_owners.tags is kept up to date by the trigger below
+CREATE INDEX tags_new_uses_idx ON tags_new (uses DESC NULLS LAST);
+CREATE INDEX tags_new_owner_uses_idx ON tags_new (owner, uses DESC NULLS LAST);
+
+CREATE TABLE tag_stats_owners (
+    owner BIGINT PRIMARY KEY,
+    tags INT NOT NULL DEFAULT 0,
+    uses BIGINT NOT NULL DEFAULT 0
+);
+CREATE INDEX tag_stats_owners_uses_idx ON tag_stats_owners (uses DESC);
+
+CREATE TABLE tag_stats_daily (
+    day DATE NOT NULL,
+    tagId INT NOT NULL, -- not a foreign key, rows for deleted tags are dropped by the joins
+    uses INT NOT NULL,
+    PRIMARY KEY (tagId, day)
+);
+CREATE INDEX tag_stats_daily_day_idx ON tag_stats_daily (day);
+
+CREATE FUNCTION tagOwnerStats()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql
+    AS
+    $$
+    BEGIN
+        IF (TG_OP = 'DELETE' OR TG_OP = 'UPDATE')
+            THEN UPDATE tag_stats_owners SET tags = tags - 1, uses = uses - COALESCE(OLD.uses, 0) WHERE owner = OLD.owner;
+        END IF;
+        IF (TG_OP = 'INSERT' OR TG_OP = 'UPDATE')
+            THEN INSERT INTO tag_stats_owners (owner, tags, uses) VALUES (NEW.owner, 1, COALESCE(NEW.uses, 0))
+                ON CONFLICT (owner) DO UPDATE SET tags = tag_stats_owners.tags + 1, uses = tag_stats_owners.uses + EXCLUDED.uses;
+        END IF;
+        RETURN NULL;
+    END
+    $$;
+
+-- uses aren't in the column list, those are added to tag_stats_owners by the flush itself
+CREATE TRIGGER tagsNewOwnerStats
+    AFTER INSERT OR DELETE OR UPDATE OF owner ON tags_new
+    FOR EACH ROW EXECUTE FUNCTION tagOwnerStats();
+
+INSERT INTO tag_stats_owners (owner, tags, uses)
+    SELECT owner, COUNT(*), COALESCE(SUM(uses), 0) FROM tags_new GROUP BY owner
+    ON CONFLICT (owner) DO NOTHING;
+
+-- every tag use, summed per minute. Only kept for a few days, anything older is read from the rollups
+CREATE TABLE tag_usage_events (
+    minute TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    tagId INT NOT NULL,
+    userId BIGINT NOT NULL,
+    channelId BIGINT,
+    uses INT NOT NULL
+);
+CREATE INDEX tag_usage_events_minute_idx ON tag_usage_events USING BRIN (minute);
+
+CREATE TABLE tag_usage_hourly (
+    tagId INT NOT NULL,
+    hour TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    uses INT NOT NULL,
+    PRIMARY KEY (tagId, hour)
+);
+CREATE INDEX tag_usage_hourly_hour_idx ON tag_usage_hourly (hour);
+
+-- the legacy tags table (cogs/devision.py) predates this file, so only index it where it exists
+DO $$
+BEGIN
+    IF to_regclass('tags') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS tags_lower_name_idx ON tags (LOWER(name));
+    END IF;
+END
+$$;
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class Superseding:
+    """
+    At most one in-flight autocomplete per user: a newer keystroke cancels the older one, which then
+    returns ``default``. Discord only shows the newest response anyway.
+    """
+
+    def __init__(self) -> None:
+        self._running: Dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, aw: Awaitable[T], default: T) -> T:
+        previous = self._running.pop(key, None)
+        if previous is not None:
+            previous.cancel()
+
+        task = self._running[key] = asyncio.ensure_future(aw)
+        try:
+            return await task
+        except asyncio.CancelledError:
+            return default
+        finally:
+            if self._running.get(key) is task:
+                del self._running[key]
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import asyncpg
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from bot import Alfred
+
+MAX_ATTEMPTS = 5  # before an effect is left in the table for someone to look at
+CONCURRENCY = 10  # effects run at once when replaying a backlog
+
+Handler = Callable[["Alfred", dict], Awaitable[Any]]
+
+
+class Outbox:
+    """
+    Side effects that have to happen once a database change is committed.
+
+    Effects are written to the ``outbox`` table in the same transaction as the change they belong to,
+    then run concurrently; each row is deleted as soon as its effect has gone through. Anything left over
+    (the bot crashed or Discord errored) is retried by :meth:`replay` on the next start, so an effect
+    runs at least once, and possibly twice if the bot died between running it and deleting its row.
+
+    Handlers are plain coroutines taking the bot and the effect's JSON payload, registered by name
+    with :meth:`handler`. Effects that have to happen in order belong in one handler.
+    """
+
+    def __init__(self, bot: Alfred) -> None:
+        self.bot = bot
+        self.handlers: Dict[str, Handler] = {}
+
+    def handler(self, name: str) -> Callable[[Handler], Handler]:
+        def decorator(func: Handler) -> Handler:
+            self.handlers[name] = func
+            return func
+        return decorator
+
+    async def add(self, effects: Iterable[Tuple[str, dict]], *, conn: asyncpg.Connection) -> List[asyncpg.Record]:
+        """Queues effects as part of ``conn``'s transaction. Pass what this returns to :meth:`run` after it commits."""
+        names, payloads = [], []
+        for name, payload in effects:
+            names.append(name)
+            payloads.append(json.dumps(payload))
+
+        return await self.bot.queries.fetch("outbox.add", names, payloads, conn=conn)
+
+    async def run(self, jobs: List[asyncpg.Record]) -> None:
+        semaphore = asyncio.Semaphore(CONCURRENCY)
+
+        async def run_one(job: asyncpg.Record) -> None:
+            async with semaphore:
+                ok = await self._run(job)
+            # straight away, so a crash while the others are running doesn't repeat this one
+            await self.bot.queries.execute("outbox.done" if ok else "outbox.failed", [job['id']])
+
+        await asyncio.gather(*(run_one(job) for job in jobs))
+
+    async def replay(self) -> None:
+        jobs = await self.bot.queries.fetch("outbox.pending", MAX_ATTEMPTS)
+        if jobs:
+            print(f"[OUTBOX] Retrying {len(jobs)} unfinished effects")
+            await self.run(jobs)
+
+    async def _run(self, job: asyncpg.Record) -> bool:
+        handler: Optional[Handler] = self.handlers.get(job['effect'])
+        if handler is None:
+            print(f"[OUTBOX] No handler for {job['effect']} (#{job['id']})")
+            return False
+
+        try:
+            await handler(self.bot, json.loads(job['payload']))
+        except Exception as e:
+            print(f"[OUTBOX] {job['effect']} (#{job['id']}) failed: {e!r}")
+            return False
+
+        return True
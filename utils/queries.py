@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import time
+
+import asyncpg
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from bot import Alfred
+
+# Every statement the bot runs, by name. They're prepared on each pool connection as it's opened.
+QUERIES: Dict[str, str] = {
+    # cogs/tags.py, tags_new/tag_lookup
+    "tags.lookup": "SELECT * FROM lookupTag($1)",
+    "tags.similar": """
+        SELECT
+            name
+        FROM
+            tag_lookup
+        WHERE
+            name % $1
+        ORDER BY
+            similarity(name, $1)
+            DESC
+            LIMIT 10
+        """,
+    "tags.create": "SELECT createTag($1, $2, $3)",
+    "tags.alias": "SELECT createAlias($1, $2)",
+    "tags.delete": "SELECT deleteTag($1, $2)",
+    "tags.info": """
+        SELECT
+            tl.tagId, tl.isAlias, tn.name, tn.owner, tn.uses, tn.created
+        FROM tag_lookup tl
+        INNER JOIN tags_new tn ON tn.id = tl.tagId
+        WHERE tl.name = $1
+        """,
+    "tags.owner": """
+        SELECT
+            tl.tagId, tn.owner
+        FROM tag_lookup tl
+        INNER JOIN tags_new tn ON tn.id = tl.tagId
+        WHERE tl.name = $1
+        """,
+    "tags.edit": """
+        UPDATE tags_new
+        SET
+            content = $1
+        WHERE
+            id = $2
+        """,
+    # the rollups read by utils/tagstats.py are bumped in the same statement
+    "tags.add_uses": """
+        WITH events AS (
+            SELECT * FROM unnest($1::INT[], $2::TIMESTAMP[], $3::INT[]) AS events(id, minute, n)
+        ), used AS (
+            UPDATE tags_new
+            SET
+                uses = uses + counts.n
+            FROM
+                (SELECT id, SUM(n) AS n FROM events GROUP BY id) AS counts
+            WHERE
+                tags_new.id = counts.id
+            RETURNING tags_new.id, tags_new.owner, counts.n
+        ), owners AS (
+            UPDATE tag_stats_owners
+            SET
+                uses = tag_stats_owners.uses + per_owner.n
+            FROM
+                (SELECT owner, SUM(n) AS n FROM used GROUP BY owner) AS per_owner
+            WHERE
+                tag_stats_owners.owner = per_owner.owner
+        ), hourly AS (
+            INSERT INTO tag_usage_hourly (tagId, hour, uses)
+                SELECT id, date_trunc('hour', minute), SUM(n) FROM events WHERE id IN (SELECT id FROM used) GROUP BY 1, 2
+            ON CONFLICT (tagId, hour) DO UPDATE SET uses = tag_usage_hourly.uses + EXCLUDED.uses
+        )
+        INSERT INTO tag_stats_daily (tagId, day, uses)
+            SELECT id, minute::DATE, SUM(n) FROM events WHERE id IN (SELECT id FROM used) GROUP BY 1, 2
+        ON CONFLICT (tagId, day) DO UPDATE SET uses = tag_stats_daily.uses + EXCLUDED.uses
+        """,
+    # every match is ranked, so the top $2 really are the best ones. That's one ts_rank per match, which is
+    # cheap next to ts_headline, and that only runs on the rows that are returned
+    "tags.search": """
+        SELECT
+            id, name, ts_headline('english', content, query, 'MaxFragments=1, MaxWords=20, MinWords=8, StartSel=**, StopSel=**') AS snippet
+        FROM (
+            SELECT
+                id, name, content, query, ts_rank(search, query) AS rank
+            FROM tags_new, websearch_to_tsquery('english', $1) AS query
+            WHERE search @@ query
+            ORDER BY rank DESC, id
+            LIMIT $2
+        ) AS ranked
+        ORDER BY rank DESC, id
+        """,
+    "tags.all": "SELECT id, name, content FROM tags_new",
+    "tags.all_names": "SELECT name, tagId FROM tag_lookup",
+    "tags.by_id": "SELECT name, content FROM tags_new WHERE id = $1",
+    "tags.lookup_id": "SELECT tagId FROM tag_lookup WHERE name = $1",
+
+    # utils/tagstats.py
+    "stats.top_tags": "SELECT id, name, owner, uses FROM tags_new ORDER BY uses DESC NULLS LAST LIMIT $1",
+    "stats.top_owners": "SELECT owner, tags, uses FROM tag_stats_owners ORDER BY uses DESC LIMIT $1",
+    "stats.recent": """
+        SELECT
+            tn.id, tn.name, SUM(d.uses) AS uses
+        FROM tag_stats_daily d
+        INNER JOIN tags_new tn ON tn.id = d.tagId
+        WHERE d.day > (NOW() AT TIME ZONE 'utc')::DATE - $1::INT
+        GROUP BY tn.id, tn.name
+        ORDER BY uses DESC
+        LIMIT $2
+        """,
+    "stats.totals": "SELECT COALESCE(SUM(tags), 0) AS tags, COALESCE(SUM(uses), 0) AS uses FROM tag_stats_owners",
+    "stats.owner": "SELECT tags, uses FROM tag_stats_owners WHERE owner = $1",
+    "stats.owner_top": "SELECT id, name, uses FROM tags_new WHERE owner = $1 ORDER BY uses DESC NULLS LAST LIMIT $2",
+
+    # utils/tagusage.py, reads only ever touch the rollups, never tag_usage_events
+    "usage.total": """
+        SELECT
+            COALESCE(SUM(uses), 0)
+        FROM tag_stats_daily
+        WHERE tagId = $1 AND day > (NOW() AT TIME ZONE 'utc')::DATE - $2::INT
+        """,
+    "usage.daily": """
+        SELECT
+            day, uses
+        FROM tag_stats_daily
+        WHERE tagId = $1 AND day > (NOW() AT TIME ZONE 'utc')::DATE - $2::INT
+        ORDER BY day
+        """,
+    "usage.hourly": """
+        SELECT
+            hour, uses
+        FROM tag_usage_hourly
+        WHERE tagId = $1 AND hour > date_trunc('hour', NOW() AT TIME ZONE 'utc') - make_interval(hours => $2::INT)
+        ORDER BY hour
+        """,
+    "usage.prune_events": "DELETE FROM tag_usage_events WHERE minute < (NOW() AT TIME ZONE 'utc') - make_interval(days => $1::INT)",
+    "usage.prune_hourly": "DELETE FROM tag_usage_hourly WHERE hour < (NOW() AT TIME ZONE 'utc') - make_interval(days => $1::INT)",
+
+    # utils/outbox.py
+    "outbox.add": """
+        INSERT INTO outbox (effect, payload)
+            SELECT * FROM unnest($1::TEXT[], $2::JSONB[])
+        RETURNING id, effect, payload
+        """,
+    "outbox.done": "DELETE FROM outbox WHERE id = ANY($1::INT[])",
+    "outbox.failed": "UPDATE outbox SET attempts = attempts + 1 WHERE id = ANY($1::INT[])",
+    "outbox.pending": "SELECT id, effect, payload FROM outbox WHERE attempts < $1 ORDER BY id",
+
+    # utils/timers.py
+    "timers.schedule": "INSERT INTO scheduled_actions (action, due, payload) VALUES ($1, $2, $3) RETURNING id, action, due, payload",
+    "timers.pending": "SELECT id, action, due, payload FROM scheduled_actions WHERE attempts < $1 ORDER BY due",
+    "timers.done": "DELETE FROM scheduled_actions WHERE id = $1",
+    "timers.failed": "UPDATE scheduled_actions SET attempts = attempts + 1 WHERE id = $1 RETURNING attempts",
+
+    # cogs/devision.py, the legacy tags table
+    "legacy_tags.by_id": "SELECT * FROM tags WHERE tag_id = $1 AND aliases IS NULL",
+    # the tag itself, or the tag it's an alias of, in one round trip. Uses tags_lower_name_idx
+    # (a tag joins to itself; NULLIF since an empty aliases was never treated as an alias)
+    "legacy_tags.resolve": """
+        SELECT target.* FROM tags found
+        INNER JOIN tags target ON target.name = COALESCE(NULLIF(found.aliases, ''), found.name)
+        WHERE LOWER(found.name) = $1 LIMIT 1
+        """,
+    "legacy_tags.id_by_lower_name": "SELECT tag_id FROM tags WHERE LOWER(name) = $1",
+    "legacy_tags.create": "INSERT INTO tags VALUES($1, $2, $3, (NOW() AT TIME ZONE 'utc'))",
+    "legacy_tags.create_alias": "INSERT INTO tags VALUES($1, $2, $3, $4, $5)",
+    "legacy_tags.delete": "DELETE FROM tags WHERE name = $1",
+    "legacy_tags.page": "SELECT tag_id, name FROM tags WHERE tag_id > $1 ORDER BY tag_id LIMIT $2",
+    "legacy_tags.page_by_owner": "SELECT tag_id, name FROM tags WHERE owner_id = $1 AND tag_id > $2 ORDER BY tag_id LIMIT $3",
+    "legacy_tags.search": "SELECT tag_id, name FROM tags WHERE SIMILARITY(name, $1) > 0.75 ORDER BY similarity(name, $1) DESC LIMIT 150",
+    "legacy_tags.edit": "UPDATE tags SET content = $2 WHERE name = $1",
+
+    # cogs/devision.py, bot invites
+    "bots.get": "SELECT * FROM bots WHERE bot_id = $1",
+    "bots.exists": "SELECT 1 FROM bots WHERE bot_id = $1",
+    "bots.create": "INSERT INTO bots VALUES($1, $2, $3, $4, $5, $6)",
+    "bots.delete": "DELETE FROM bots WHERE bot_id = $1 RETURNING *",
+    "bots.delete_by_owner": "DELETE FROM bots WHERE owner_id = $1 RETURNING *",
+    "bots.mark_added": "UPDATE bots SET date_add = $1 WHERE bot_id = $2 RETURNING *",
+
+    # cogs/reports.py
+    "reports.open": "SELECT id, target, reportMessage FROM modreports WHERE mod IS NULL AND reportMessage IS NOT NULL",
+    # nothing is returned if another mod got there first
+    "reports.resolve": "UPDATE modreports SET mod = $1, modAction = $2, modRemarks = $3, modResponse = $4 WHERE id = $5 AND mod IS NULL RETURNING id",
+    "reports.reserve_id": "SELECT nextval(pg_get_serial_sequence('modreports', 'id'))",
+    "reports.create": """
+            WITH incident AS (
+                INSERT INTO modreports
+                    (id, reporter, target, reportRemarks, channel, message, reportMessage)
+                VALUES
+                    ($1, $2, $3, $4, $5, $6, $7)
+                RETURNING id, reporter, reportRemarks
+            )
+            INSERT INTO modreport_reporters (incident, reporter, remarks)
+                SELECT id, reporter, reportRemarks FROM incident
+            """,
+    # nothing is returned if they've already reported this incident
+    "reports.add_reporter": """
+            INSERT INTO modreport_reporters (incident, reporter, remarks)
+            VALUES ($1, $2, $3)
+            ON CONFLICT DO NOTHING
+            RETURNING incident
+            """,
+}
+
+
+class Connection(asyncpg.Connection):
+    """
+    Pool connection that can prepare the registered statements ahead of their first use.
+
+    They're kept in asyncpg's own statement cache, which lasts as long as the connection does. A
+    PreparedStatement from ``prepare()`` can't be kept instead, it stops working as soon as the
+    connection goes back to the pool.
+    """
+
+    async def prepare_cached(self, sql: str) -> None:
+        await self._get_statement(sql, None)
+
+
+class QueryStats:
+    __slots__ = ("calls", "total", "slowest")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.total = 0.0
+        self.slowest = 0.0
+
+    @property
+    def average(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+
+class Queries:
+    """
+    The registry of named statements.
+
+    Pass ``init`` as the pool's ``init`` hook and :class:`Connection` as its ``connection_class``, and
+    every connection prepares all of ``QUERIES`` when it's opened. Statements are then run by name,
+    e.g. ``await bot.queries.fetchrow("tags.lookup", name)``, and timed per name in ``stats``.
+
+    A statement whose result type changed under it (an ALTER TABLE and the like) raises
+    InvalidCachedStatementError. Outside a transaction asyncpg prepares it again and retries once; inside
+    one the transaction is already aborted, so the error is raised and the next use prepares it again.
+    """
+
+    def __init__(self, bot: Alfred, queries: Dict[str, str] = QUERIES) -> None:
+        self.bot = bot
+        self.sql = dict(queries)
+        self.stats: Dict[str, QueryStats] = {name: QueryStats() for name in self.sql}
+
+    async def init(self, conn: Connection) -> None:
+        for name, sql in self.sql.items():
+            try:
+                await conn.prepare_cached(sql)
+            except asyncpg.PostgresError as e:
+                # e.g. a table that doesn't exist yet, it'll be prepared again when it's first used
+                print(f"[DB] Could not prepare {name}: {e!r}")
+
+    def _record(self, name: str, elapsed: float) -> None:
+        stats = self.stats[name]
+        stats.calls += 1
+        stats.total += elapsed
+        stats.slowest = max(stats.slowest, elapsed)
+
+    async def _run(self, method: str, name: str, args: tuple, conn: Optional[asyncpg.Connection]) -> Any:
+        if conn is None:
+            async with self.bot.db.acquire() as conn:
+                return await self._run(method, name, args, conn)
+
+        start = time.perf_counter()
+        try:
+            # found in the connection's statement cache, where init put it
+            return await getattr(conn, method)(self.sql[name], *args)
+        finally:
+            self._record(name, time.perf_counter() - start)
+
+    async def fetch(self, name: str, *args: Any, conn: Optional[asyncpg.Connection] = None) -> List[asyncpg.Record]:
+        return await self._run("fetch", name, args, conn)
+
+    async def fetchrow(self, name: str, *args: Any, conn: Optional[asyncpg.Connection] = None) -> Optional[asyncpg.Record]:
+        return await self._run("fetchrow", name, args, conn)
+
+    async def fetchval(self, name: str, *args: Any, conn: Optional[asyncpg.Connection] = None) -> Any:
+        return await self._run("fetchval", name, args, conn)
+
+    async def cursor(self, name: str, *args: Any, conn: asyncpg.Connection, prefetch: Optional[int] = None) -> AsyncIterator[asyncpg.Record]:
+        """
+        Iterates over a statement's rows a batch at a time, ``async for row in queries.cursor(...)``.
+        ``conn`` has to be in a transaction. The time spent fetching batches is timed as one call,
+        the time spent on the rows in between isn't.
+        """
+        rows = conn.cursor(self.sql[name], *args, prefetch=prefetch).__aiter__()
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    row = await rows.__anext__()
+                except StopAsyncIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield row
+        finally:
+            self._record(name, elapsed)
+
+    async def execute(self, name: str, *args: Any, conn: Optional[asyncpg.Connection] = None) -> None:
+        # conn.execute() would skip the statement cache without arguments, the (empty) result is simply dropped
+        await self._run("fetch", name, args, conn)
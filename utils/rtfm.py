@@ -0,0 +1,762 @@
+import asyncio
+import json
+import mmap
+import multiprocessing
+import os
+import re
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from heapq import nsmallest
+from io import BytesIO
+from itertools import compress
+from operator import add
+
+
+class _LineBuffer:
+    # Splits a byte stream into decoded lines. Lines are decoded straight out of the buffer through
+    # a memoryview and the buffer is only compacted once per chunk, so the unread tail is never
+    # copied once per line.
+    __slots__ = ('_buf',)
+
+    def __init__(self):
+        self._buf = bytearray()
+
+    def feed(self, data):
+        buf = self._buf
+        buf += data
+        lines = []
+        pos = 0
+        end = buf.find(b'\n')
+        with memoryview(buf) as view:
+            while end != -1:
+                lines.append(str(view[pos:end], 'utf-8'))
+                pos = end + 1
+                end = buf.find(b'\n', pos)
+
+        del buf[:pos]
+        return lines
+
+    def close(self):
+        tail = self._buf
+        self._buf = bytearray()
+        return [tail.decode('utf-8')] if tail else []
+
+
+class SphinxObjectFileReader:
+    # Inspired by Sphinx's InventoryFileReader
+    BUFSIZE = 16 * 1024
+
+    def __init__(self, buffer):
+        self.stream = BytesIO(buffer)
+
+    def readline(self):
+        return self.stream.readline().decode('utf-8')
+
+    def skipline(self):
+        self.stream.readline()
+
+    def read_chunks(self):
+        while True:
+            chunk = self.stream.read(self.BUFSIZE)
+            if len(chunk) == 0:
+                break
+            yield chunk
+
+    def read_compressed_chunks(self):
+        decompressor = zlib.decompressobj()
+        for chunk in self.read_chunks():
+            yield decompressor.decompress(chunk)
+        yield decompressor.flush()
+
+    def read_compressed_lines(self):
+        lines = _LineBuffer()
+        for chunk in self.read_compressed_chunks():
+            yield from lines.feed(chunk)
+        yield from lines.close()
+
+
+class InventoryParser:
+    """
+    Incrementally parses a Sphinx ``objects.inv`` file into a name -> url mapping.
+
+    Raw bytes are pushed in with ``feed`` as they arrive, e.g. straight from an aiohttp response,
+    and ``close`` returns the finished mapping. Nothing but the current partial line is kept around.
+    """
+    BUFSIZE = SphinxObjectFileReader.BUFSIZE
+    # This code mostly comes from the Sphinx repository.
+    entry_regex = re.compile(r'(?x)(.+?)\s+(\S*:\S*)\s+(-?\d+)\s+(\S+)\s+(.*)')
+
+    def __init__(self, url):
+        self.url = url
+        self.projname = None
+        self.version = None
+        self.result = {}
+        self._header = bytearray()
+        self._decompressor = None
+        self._lines = _LineBuffer()
+
+    def _read_header(self, final=False):
+        # the header is four uncompressed lines, everything after it is zlib compressed
+        header = self._header
+        pos = 0
+        for _ in range(4):
+            pos = header.find(b'\n', pos) + 1
+            if not pos:
+                if not final:
+                    return None
+                pos = len(header)
+                break
+
+        lines = header[:pos].decode('utf-8').split('\n') + ['', '', '', '']
+
+        # first line is version info
+        if lines[0].rstrip() != '# Sphinx inventory version 2':
+            raise RuntimeError('Invalid objects.inv file version.')
+
+        # next line is "# Project: <name>"
+        # then after that is "# Version: <version>"
+        self.projname = lines[1].rstrip()[11:]
+        self.version = lines[2].rstrip()[11:]
+
+        # next line says if it's a zlib header
+        if 'zlib' not in lines[3]:
+            raise RuntimeError('Invalid objects.inv file, not z-lib compatible.')
+
+        self._decompressor = zlib.decompressobj()
+        rest = bytes(header[pos:])
+        self._header = None
+        return rest
+
+    def feed(self, data):
+        if self._decompressor is None:
+            self._header += data
+            data = self._read_header()
+            if data is None:
+                return
+
+        self._add_lines(self._lines.feed(self._decompressor.decompress(data)))
+
+    def close(self):
+        if self._decompressor is None:
+            self._add_lines(self._lines.feed(self._decompressor.decompress(self._read_header(final=True))))
+
+        self._add_lines(self._lines.feed(self._decompressor.flush()))
+        self._add_lines(self._lines.close())
+        return self.result
+
+    def _add_lines(self, lines):
+        # key: URL
+        # n.b.: key doesn't have `discord` or `discord.ext.commands` namespaces
+        result = self.result
+        url = self.url
+        is_dpy = self.projname == 'discord.py'
+        match_entry = self.entry_regex.match
+
+        for line in lines:
+            match = match_entry(line.rstrip())
+            if not match:
+                continue
+
+            name, directive, prio, location, dispname = match.groups()
+            domain, _, subdirective = directive.partition(':')
+            if directive == 'py:module' and name in result:
+                # From the Sphinx Repository:
+                # due to a bug in 1.1 and below,
+                # two inventory entries are created
+                # for Python modules, and the first
+                # one is correct
+                continue
+
+            # Most documentation pages have a label
+            if directive == 'std:doc':
+                subdirective = 'label'
+
+            if location.endswith('$'):
+                location = location[:-1] + name
+
+            key = name if dispname == '-' else dispname
+            prefix = f'{subdirective}:' if domain == 'std' else ''
+
+            if is_dpy:
+                key = key.replace('discord.ext.commands.', '').replace('discord.', '').replace('ext.menus.', '')
+
+            result[f'{prefix}{key}'] = os.path.join(url, location)
+
+
+def parse_object_inv(stream, url):
+    """Parses a whole ``objects.inv`` held by a :class:`SphinxObjectFileReader`."""
+    parser = InventoryParser(url)
+    for chunk in stream.read_chunks():
+        parser.feed(chunk)
+
+    return parser.close()
+
+
+# On-disk inventory table:
+#   magic, then a little-endian header of (entry count, metadata length, keys length, urls length),
+#   the JSON metadata (url, etag, last_modified), then the newline separated keys in sorted order
+#   and their urls in the same order. Urls are stored relative to the docs url when they all share it.
+CACHE_MAGIC = b'RTFMINV1'
+_CACHE_HEADER = struct.Struct('<IIII')
+
+
+class CachedInventory:
+    __slots__ = ('entries', 'url', 'etag', 'last_modified')
+
+    def __init__(self, entries, url, etag=None, last_modified=None):
+        self.entries = entries
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def validators(self):
+        """The conditional request headers to revalidate this inventory with."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def save(self, path):
+        keys = sorted(self.entries)
+        urls = [self.entries[k] for k in keys]
+
+        base = self.url.rstrip('/') + '/'
+        relative = all(u.startswith(base) for u in urls)
+        if relative:
+            urls = [u[len(base):] for u in urls]
+
+        meta = json.dumps({'url': self.url, 'etag': self.etag, 'last_modified': self.last_modified, 'relative': relative}).encode('utf-8')
+        key_blob = '\n'.join(keys).encode('utf-8')
+        url_blob = '\n'.join(urls).encode('utf-8')
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(CACHE_MAGIC)
+            f.write(_CACHE_HEADER.pack(len(keys), len(meta), len(key_blob), len(url_blob)))
+            f.write(meta)
+            f.write(key_blob)
+            f.write(url_blob)
+
+        os.replace(tmp, path)
+
+    @classmethod
+    def load_meta(cls, path):
+        """Like ``load``, but only reads the metadata. ``entries`` is None on the returned inventory."""
+        try:
+            with open(path, 'rb') as f:
+                header = f.read(len(CACHE_MAGIC) + _CACHE_HEADER.size)
+                if header[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+                    return None
+
+                _, meta_len, _, _ = _CACHE_HEADER.unpack_from(header, len(CACHE_MAGIC))
+                meta = json.loads(f.read(meta_len))
+        except (OSError, ValueError, struct.error):
+            return None
+
+        return cls(None, meta['url'], meta['etag'], meta['last_modified'])
+
+    @classmethod
+    def load(cls, path):
+        """Loads an inventory saved with ``save``. Returns None if it is missing or unreadable."""
+        try:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                if view[:len(CACHE_MAGIC)] != CACHE_MAGIC:
+                    return None
+
+                pos = len(CACHE_MAGIC)
+                count, meta_len, keys_len, urls_len = _CACHE_HEADER.unpack_from(view, pos)
+                pos += _CACHE_HEADER.size
+                meta = json.loads(view[pos:pos + meta_len])
+                pos += meta_len
+                keys = view[pos:pos + keys_len].decode('utf-8').split('\n')
+                pos += keys_len
+                urls = view[pos:pos + urls_len].decode('utf-8').split('\n')
+        except (OSError, ValueError, struct.error):
+            return None
+
+        if not count or len(keys) != count or len(urls) != count:
+            return None
+
+        if meta['relative']:
+            base = meta['url'].rstrip('/') + '/'
+            urls = [base + u for u in urls]
+
+        return cls(dict(zip(keys, urls)), meta['url'], meta['etag'], meta['last_modified'])
+
+_LAST = '\U0010ffff'  # sorts after any character a name has
+_BIT_BYTES = bytes.maketrans(b'01', b'\x00\x01')
+
+
+def _subsequence(query):
+    # matches the same span as finder's lazy pattern, as group 1, but each [^c]*c can only match one
+    # way, so a name that doesn't match fails without backtracking
+    first = re.escape(query[0])
+    rest = ''.join(f'[^{c}]*{c}' for c in map(re.escape, query[1:]))
+    return re.compile(f'[^{first}]*({first}{rest})')
+
+
+def finder(text, collection, *, key=None, lazy=True):
+    suggestions = []
+    text = str(text)
+    pat = '.*?'.join(map(re.escape, text))
+    regex = re.compile(pat, flags=re.IGNORECASE)
+    for item in collection:
+        to_search = key(item) if key else item
+        r = regex.search(to_search)
+        if r:
+            suggestions.append((len(r.group()), r.start(), item))
+
+    def sort_key(tup):
+        if key:
+            return tup[0], tup[1], key(tup[2])
+        return tup
+
+    if lazy:
+        return (z for _, _, z in sorted(suggestions, key=sort_key))
+    else:
+        return [z for _, _, z in sorted(suggestions, key=sort_key)]
+
+
+class RTFMIndex:
+    """
+    A search index over a single parsed inventory (name -> url).
+
+    ``search`` returns exactly what ``finder`` ranks first, without matching the query against every
+    entry. finder ranks a match by its length, then where it starts, then by name, and no match is
+    shorter than the query:
+
+    - entries starting with the query tie on the first two, so if there are ``limit`` of them they're
+      the answer. They're found with a binary search over the sorted names.
+    - the other matches as long as the query contain it where its first character first appears.
+      Trigram postings are kept in order of position and then name, so the query's rarest trigram
+      yields them in rank order and is only read until there are enough of them.
+    - any other match is longer than the query by at least the number of the query's adjacent pairs
+      of characters that aren't in the entry at all. Entries holding every character of the query
+      are scored in order of that bound, from a bitmask per character and per pair, until it's
+      worse than the ``limit``-th best match so far.
+    """
+    __slots__ = ('entries', 'memory', '_items', '_lowered', '_trigrams', '_masks', '_order', '_sorted', '_cased', '_names')
+
+    SCAN_GROUP = 512  # candidates it takes for compiling a pattern to beat finding one character at a time
+
+    def __init__(self, entries):
+        self.entries = entries
+        self._items = items = list(entries.items())
+        self._lowered = lowered = [name.lower() for name, _ in items]
+
+        # entries in order of name, which is how finder breaks ties, and how the postings are kept
+        self._cased = array('I', sorted(range(len(items)), key=lambda idx: items[idx][0]))
+        self._names = [items[idx][0] for idx in self._cased]
+
+        # trigram -> every (position << 32 | entry) it's found at, ordered by position and then name
+        trigrams = {}
+        active = [idx for idx in self._cased if len(lowered[idx]) > 2]
+        pos = 0
+        while active:
+            for idx in active:
+                gram = lowered[idx][pos:pos + 3]
+                try:
+                    trigrams[gram].append(pos << 32 | idx)
+                except KeyError:
+                    trigrams[gram] = array('Q', (pos << 32 | idx,))
+            pos += 1
+            active = [idx for idx in active if len(lowered[idx]) > pos + 2]
+
+        masks = {}
+        size = len(lowered) // 8 + 1
+        for idx, name in enumerate(lowered):
+            byte, bit = divmod(idx, 8)
+            flag = 1 << bit
+            for gram in set(name).union(map(add, name, name[1:])):
+                try:
+                    masks[gram][byte] |= flag
+                except KeyError:
+                    masks[gram] = bytearray(size)
+                    masks[gram][byte] |= flag
+
+        self._trigrams = trigrams
+        # one bitmask per character and per pair of adjacent characters, bit n set when entry n contains it
+        self._masks = {gram: int.from_bytes(mask, 'little') for gram, mask in masks.items()}
+        # lowercased names in sorted order, for prefix lookups
+        self._order = array('I', sorted(range(len(lowered)), key=lowered.__getitem__))
+        self._sorted = [lowered[idx] for idx in self._order]
+        self.memory = self._measure()
+
+    def _measure(self):
+        # approximate bytes held by this index, strings shared between structures are only counted once
+        size = sys.getsizeof
+        total = size(self.entries) + size(self._items) + size(self._lowered) + size(self._trigrams) + size(self._masks)
+        for (name, url), lowered in zip(self._items, self._lowered):
+            total += size(name) + size(url) + size((name, url))
+            if lowered is not name:
+                total += size(lowered)
+        for gram, posting in self._trigrams.items():
+            total += size(gram) + size(posting)
+        for gram, mask in self._masks.items():
+            total += size(gram) + size(mask)
+        total += size(self._order) + size(self._sorted) + size(self._cased) + size(self._names)
+
+        return total
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __getitem__(self, name):
+        return self.entries[name]
+
+    @staticmethod
+    def _bits(mask):
+        # the positions of the set bits, read from the end of its binary representation
+        bits = bin(mask)
+        if bits.count('1') * 16 > len(bits):
+            # dense enough that expanding it to a byte per bit is quicker
+            return list(compress(range(len(bits) - 2), bits[:1:-1].encode().translate(_BIT_BYTES)))
+
+        last = len(bits) - 1
+        result = []
+        idx = bits.rfind('1', 2)
+        while idx != -1:
+            result.append(last - idx)
+            idx = bits.rfind('1', 2, idx)
+
+        return result
+
+    def _prefixed(self, query, limit):
+        # the first ``limit`` entries by name among those starting with ``query``, ignoring case
+        names = self._sorted
+        lo = bisect_left(names, query)
+        hi = bisect_right(names, query + _LAST, lo)
+        if hi - lo <= limit * 4:
+            items = self._items
+            return sorted(self._order[lo:hi], key=lambda idx: items[idx][0])[:limit]
+
+        # too many to sort, so look each way of casing the query up in the names sorted by case
+        cased = self._names
+        spans = [('', 0, len(cased))]
+        for char in query:
+            narrowed = []
+            for prefix, start, end in spans:
+                for variant in {char, char.upper()}:
+                    first = bisect_left(cased, prefix + variant, start, end)
+                    last = bisect_right(cased, prefix + variant + _LAST, first, end)
+                    if first < last:
+                        narrowed.append((prefix + variant, first, last))
+            spans = narrowed
+            if len(spans) > limit * 4:
+                break
+        else:
+            # unless some name's lowercase doesn't line up with it character by character
+            if sum(end - start for _, start, end in spans) == hi - lo:
+                found = sorted(pos for _, start, end in spans for pos in range(start, min(end, start + limit)))
+                return [self._cased[pos] for pos in found[:limit]]
+
+        items = self._items
+        return nsmallest(limit, self._order[lo:hi], key=lambda idx: items[idx][0])
+
+    def prefix_search(self, query, *, limit=8):
+        """Entries whose name starts with ``query``, ignoring case, in order of name."""
+        return [self._items[idx] for idx in self._prefixed(str(query).lower(), limit)]
+
+    def search(self, query, *, limit=8, fuzzy=True):
+        """
+        The best ``limit`` matches for ``query``, ranked like ``finder``.
+
+        With ``fuzzy=False`` only entries containing the query are ranked, and queries shorter than a
+        trigram become a prefix search.
+        """
+        query = str(query)
+        lowered = query.lower()
+        length = len(lowered)
+        items = self._items
+
+        prefixed = self._prefixed(lowered, limit)
+        if len(prefixed) == limit or not lowered or not fuzzy and length < 3:
+            return [items[idx] for idx in prefixed]
+
+        names = self._lowered
+        first, rest = lowered[0], lowered[1:]
+        # entry -> finder's sort key for it
+        found = {idx: (length, 0, items[idx][0]) for idx in prefixed}
+
+        scan = None  # finder's match as a compiled pattern, once there are enough candidates for it to pay off
+
+        def score(candidates):
+            nonlocal scan
+            if scan is None and len(candidates) > self.SCAN_GROUP:
+                scan = _subsequence(lowered).match
+            if scan is not None:
+                # entries already found just get the same score again, only the matches reach Python
+                matches = list(map(scan, map(names.__getitem__, candidates)))
+                for idx, match in compress(zip(candidates, matches), matches):
+                    start = match.start(1)
+                    found[idx] = (match.end() - start, start, items[idx][0])
+                return
+
+            for idx in candidates:
+                if idx in found:
+                    continue
+                # what finder's lazy regex matches: from the first occurrence of the query's first
+                # character, the earliest occurrence of each of the others in turn
+                name = names[idx]
+                start = name.find(first)
+                if start == -1:
+                    continue
+                if name.startswith(rest, start + 1):
+                    found[idx] = (length, start, items[idx][0])
+                    continue
+                end = start
+                for char in rest:
+                    end = name.find(char, end + 1)
+                    if end == -1:
+                        break
+                else:
+                    found[idx] = (end + 1 - start, start, items[idx][0])
+
+        def ranked():
+            return [items[idx] for idx in nsmallest(limit, found, key=found.__getitem__)]
+
+        if length < 3:
+            score(self._bits(self._masks.get(lowered, 0)))
+        else:
+            posting = None
+            offset = 0
+            for i in range(length - 2):
+                candidate = self._trigrams.get(lowered[i:i + 3], ())
+                if posting is None or len(candidate) < len(posting):
+                    posting, offset = candidate, i
+
+            # the matches as long as the query that don't start the name, in order
+            for occurrence in posting:
+                start = (occurrence >> 32) - offset
+                if start <= 0:
+                    continue
+                idx = occurrence & 0xFFFFFFFF
+                name = names[idx]
+                if name.startswith(lowered, start) and name.find(first, 0, start) == -1:
+                    found[idx] = (length, start, items[idx][0])
+                    if len(found) == limit:
+                        return ranked()
+
+            if not fuzzy:
+                contain = {occurrence & 0xFFFFFFFF for occurrence in posting}
+                score([idx for idx in contain if lowered in names[idx]])
+                return ranked()
+
+        if len(found) >= limit and nsmallest(limit, found.values())[-1][0] == length:
+            return ranked()
+
+        masks = self._masks
+        candidates = -1
+        for char in set(lowered):
+            candidates &= masks.get(char, 0)
+        if not candidates:
+            return ranked()
+        pairs = [masks.get(pair, 0) for pair in map(add, lowered, rest)]
+        if scan is None and bin(candidates).count('1') > self.SCAN_GROUP:
+            # scored a group at a time below, but all of them might be
+            scan = _subsequence(lowered).match
+
+        # level[i]: the candidates missing at most ``missing`` of the first i pairs
+        below = None
+        for missing in range(len(pairs) + 1):
+            level = [candidates]
+            for i, pair in enumerate(pairs):
+                level.append(level[i] & pair if below is None else level[i] & pair | below[i])
+
+            # missing n pairs, a match is at least n characters longer than the query, and anything
+            # that contains every pair but wasn't found above is at least one longer
+            bound = length + max(missing, 1)
+            if len(found) >= limit and nsmallest(limit, found.values())[-1][0] < bound:
+                break
+            group = level[-1] if below is None else level[-1] & ~below[-1]
+            if group:
+                score(self._bits(group))
+            below = level
+
+        return ranked()
+
+
+class RTFMRegistry:
+    """
+    The loaded RTFM indexes, kept in least recently used order.
+
+    Adding an index evicts the least recently queried ones until the total ``memory`` of what is
+    loaded fits in ``budget`` bytes again. The index that was just added is never evicted.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self._indexes = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._indexes
+
+    def __len__(self):
+        return len(self._indexes)
+
+    @property
+    def usage(self):
+        return sum(index.memory for index in self._indexes.values())
+
+    def items(self):
+        return self._indexes.items()
+
+    def peek(self, key):
+        """Like ``get``, but doesn't count as a use."""
+        return self._indexes.get(key)
+
+    def get(self, key):
+        index = self._indexes.get(key)
+        if index is not None:
+            self._indexes.move_to_end(key)
+        return index
+
+    def put(self, key, index):
+        """Adds or replaces an index, returning the keys that were evicted to make room for it."""
+        self._indexes[key] = index
+        self._indexes.move_to_end(key)
+
+        evicted = []
+        usage = self.usage
+        while usage > self.budget and len(self._indexes) > 1:
+            old_key, old = self._indexes.popitem(last=False)
+            usage -= old.memory
+            evicted.append(old_key)
+
+        return evicted
+
+
+class QueryCache:
+    """
+    A bounded LRU of finished searches, keyed by (docs key, normalized query).
+
+    ``hits``, ``misses`` and ``evictions`` count over the lifetime of the cache.
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._results = OrderedDict()
+
+    def __len__(self):
+        return len(self._results)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key, query):
+        try:
+            result = self._results[key, query]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self._results.move_to_end((key, query))
+        self.hits += 1
+        return result
+
+    def put(self, key, query, result):
+        self._results[key, query] = result
+        self._results.move_to_end((key, query))
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+            self.evictions += 1
+
+    def clear_docs(self, key):
+        """Drops every result for one docs set, for when its index is replaced or unloaded."""
+        for cached in [k for k in self._results if k[0] == key]:
+            del self._results[cached]
+
+
+# These run inside InventoryWorker, so they have to stay picklable module level functions.
+
+def finish_index(parser, path=None, etag=None, last_modified=None):
+    """Closes a fed :class:`InventoryParser`, saves the result to ``path`` and indexes it."""
+    inventory = CachedInventory(parser.close(), parser.url, etag, last_modified)
+    if path is not None:
+        inventory.save(path)
+
+    return RTFMIndex(inventory.entries)
+
+
+def build_index(data, url, path=None, etag=None, last_modified=None):
+    """Parses a complete ``objects.inv`` body, see ``finish_index``."""
+    parser = InventoryParser(url)
+    parser.feed(data)
+    return finish_index(parser, path, etag, last_modified)
+
+
+def load_index(path, url):
+    """Indexes the inventory saved at ``path``, or returns None if there isn't a usable one for ``url``."""
+    inventory = CachedInventory.load(path)
+    if inventory is None or inventory.url != url:
+        return None
+
+    return RTFMIndex(inventory.entries)
+
+
+class InventoryWorker:
+    """
+    Runs inventory parsing and indexing off the event loop.
+
+    ``mode`` is one of ``'process'``, ``'thread'`` or ``'inline'``. Process workers are started by a
+    forkserver (spawned where there is none) rather than forked from the bot, whose other threads could
+    be holding locks at the time. Either way they import ``bot.py`` as ``__mp_main__`` (hence its main
+    guard), and only run module level functions from here. A process pool that can't be created, or that
+    dies, is replaced by a thread pool.
+    """
+
+    def __init__(self, mode='process'):
+        self.mode = mode
+        self._executor = None
+
+        if mode == 'process':
+            try:
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context(method))
+            except (ValueError, OSError, NotImplementedError):
+                self.mode = 'thread'
+
+        if self.mode == 'thread':
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rtfm')
+        elif self.mode != 'process':
+            self.mode = 'inline'
+
+    @property
+    def inline(self):
+        return self._executor is None
+
+    async def run(self, func, *args):
+        if self._executor is None:
+            return func(*args)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, func, *args)
+        except BrokenProcessPool:
+            print('[RTFM] Inventory process pool died, falling back to a thread pool')
+            self._executor.shutdown(wait=False)
+            self.mode = 'thread'
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rtfm')
+            return await loop.run_in_executor(self._executor, func, *args)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
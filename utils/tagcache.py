@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from bisect import bisect_left
+
+import asyncpg
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from bot import Alfred
+
+CHANNEL = "tag_changes"
+
+
+class TagCache:
+    """
+    An in-memory copy of ``tags_new`` and ``tag_lookup``.
+
+    A dedicated connection LISTENs for the notifications sent by the ``notifyTagChange`` triggers and
+    re-reads whatever changed. If that connection drops, or a change can't be re-read, the cache is
+    marked as not ready (so callers fall back to the database) until it has reloaded everything.
+    """
+
+    def __init__(self, bot: Alfred) -> None:
+        self.bot = bot
+        self.ready = False
+        self._tags: Dict[int, Tuple[str, str]] = {}  # tag id -> (name, content)
+        self._lookup: Dict[str, int] = {}  # name or alias -> tag id
+        self._sorted: Optional[List[str]] = None  # every name and alias, rebuilt lazily after changes
+        self._conn: Optional[asyncpg.Connection] = None
+        self._pending: Optional[List[dict]] = None
+        self._reconnecting: Optional[asyncio.Task] = None
+        self._resyncing: Optional[asyncio.Task] = None
+        self._stale = False  # another reload is needed once the current one is done
+        self._apply_lock = asyncio.Lock()  # changes are applied one at a time, in the order they were sent
+        self._reload_lock = asyncio.Lock()
+        self._closed = False
+
+    def get(self, name: str) -> Optional[Tuple[int, str, str]]:
+        """Returns (id, name, content) for a tag name or alias. Only meaningful while ``ready``."""
+        tag_id = self._lookup.get(name)
+        if tag_id is None:
+            return None
+
+        tag = self._tags.get(tag_id)
+        if tag is None:
+            return None
+
+        return tag_id, tag[0], tag[1]
+
+    def prefix(self, query: str, limit: int = 10) -> List[str]:
+        """Tag names and aliases starting with ``query``, in alphabetical order. Only meaningful while ``ready``."""
+        if self._sorted is None:
+            self._sorted = sorted(self._lookup)
+
+        names = self._sorted
+        pos = bisect_left(names, query)
+        result = []
+        while pos < len(names) and len(result) < limit and names[pos].startswith(query):
+            result.append(names[pos])
+            pos += 1
+
+        return result
+
+    def start(self) -> None:
+        """Connects the listener and loads everything in the background. Callers use the database until then."""
+        if self._reconnecting is None:
+            self._reconnecting = self.bot.loop.create_task(self._reconnect())
+
+    async def close(self) -> None:
+        self._closed = True
+        self.ready = False
+        if self._reconnecting:
+            self._reconnecting.cancel()
+        if self._resyncing:
+            self._resyncing.cancel()
+        if self._conn and not self._conn.is_closed():
+            await self._conn.close()
+
+    async def _connect(self) -> None:
+        conn = await asyncpg.connect(dsn=self.bot.config['db'])
+        try:
+            # listen before loading, so nothing that changes during the load is missed
+            await conn.add_listener(CHANNEL, self._on_notify)
+            await self.reload()
+        except BaseException:
+            await conn.close()
+            raise
+
+        conn.add_termination_listener(self._on_termination)
+        self._conn = conn
+
+    async def reload(self) -> None:
+        async with self._reload_lock:
+            # notifications that arrive mid-load are replayed on top of it, else they could be overwritten
+            self._pending = []
+            try:
+                async with self.bot.db.acquire() as conn:
+                    async with conn.transaction(isolation="repeatable_read", readonly=True):
+                        tags = await self.bot.queries.fetch("tags.all", conn=conn)
+                        lookup = await self.bot.queries.fetch("tags.all_names", conn=conn)
+
+                self._tags = {r['id']: (r['name'], r['content']) for r in tags}
+                self._lookup = {r['name']: r['tagid'] for r in lookup}
+                self._sorted = None
+                pending = self._pending
+            finally:
+                self._pending = None
+
+            # a change that can't be applied fails the whole reload, rather than going missing
+            async with self._apply_lock:
+                for change in pending:
+                    await self._apply_change(change)
+
+            self.ready = True
+
+    def _on_termination(self, conn: asyncpg.Connection) -> None:
+        # anything sent while we weren't listening is lost, so it's a full reload once we're back
+        self.ready = False
+        if not self._closed:
+            self.start()
+
+    async def _reconnect(self) -> None:
+        delay = 1
+        try:
+            while not self._closed:
+                try:
+                    await self._connect()
+                    return
+                except (OSError, asyncpg.PostgresError, asyncio.TimeoutError) as e:
+                    print(f"[TAGS] Tag cache listener reconnect failed ({e!r}), retrying in {delay}s")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60)
+        finally:
+            self._reconnecting = None
+
+    def _on_notify(self, conn: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        change = json.loads(payload)
+        if change['op'] == 'RELOAD':
+            # a bulk import (utils/tagtransfer.py), which skips the per-row notifications
+            self._resync()
+        elif self._pending is not None:
+            self._pending.append(change)
+        else:
+            self.bot.loop.create_task(self._apply(change))
+
+    def _resync(self) -> None:
+        """Reloads everything in the background, retrying until it goes through."""
+        self._stale = True
+        if self._resyncing is None and not self._closed:
+            self._resyncing = self.bot.loop.create_task(self._reload_until_fresh())
+
+    async def _reload_until_fresh(self) -> None:
+        delay = 1
+        try:
+            while self._stale and not self._closed:
+                self._stale = False
+                try:
+                    await self.reload()
+                except (OSError, asyncpg.PostgresError, asyncio.TimeoutError) as e:
+                    self._stale = True
+                    print(f"[TAGS] Tag cache reload failed ({e!r}), retrying in {delay}s")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 60)
+        finally:
+            self._resyncing = None
+
+    async def _apply(self, change: dict) -> None:
+        async with self._apply_lock:
+            try:
+                await self._apply_change(change)
+            except Exception as e:
+                # the change is lost, so the cache can't be trusted until it's been reloaded
+                self.ready = False
+                print(f"[TAGS] Couldn't apply {change} to the tag cache ({e!r}), reloading")
+                self._resync()
+
+    async def _apply_change(self, change: dict) -> None:
+        if change['table'] == 'tags_new':
+            tag_id = change['id']
+            row = None
+            if change['op'] != 'DELETE':
+                row = await self.bot.queries.fetchrow("tags.by_id", tag_id)
+
+            if row is None:
+                self._tags.pop(tag_id, None)
+            else:
+                self._tags[tag_id] = (row['name'], row['content'])
+
+        else:
+            self._sorted = None
+            if change.get('old_name'):
+                self._lookup.pop(change['old_name'], None)
+
+            name = change['name']
+            tag_id = None
+            if change['op'] != 'DELETE':
+                tag_id = await self.bot.queries.fetchval("tags.lookup_id", name)
+
+            if tag_id is None:
+                self._lookup.pop(name, None)
+            else:
+                self._lookup[name] = tag_id
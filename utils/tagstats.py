@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import asyncpg
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from bot import Alfred
+
+SNAPSHOT_TTL = 60  # seconds, "tag_stats_ttl" in config.json
+LEADERBOARD_SIZE = 10
+RECENT_DAYS = 7
+
+
+class Snapshot(NamedTuple):
+    top_tags: List[asyncpg.Record]  # id, name, owner, uses
+    top_owners: List[asyncpg.Record]  # owner, tags, uses
+    recent: List[asyncpg.Record]  # id, name, uses over the last RECENT_DAYS days
+    tags: int
+    uses: int
+    taken: float  # time.monotonic() when it was read
+
+
+class OwnerStats(NamedTuple):
+    tags: int
+    uses: int
+    top_tags: List[asyncpg.Record]  # id, name, uses
+    taken: float
+
+
+class TagStats:
+    """
+    Leaderboards and per-owner tag counts.
+
+    Everything comes from rollups the database keeps up to date as tags are used (see ``tags.add_uses``
+    and the ``tagOwnerStats`` trigger), and is held for ``ttl`` seconds, so repeated leaderboard commands
+    don't hit the database at all. Concurrent refreshes are collapsed into one.
+    """
+
+    def __init__(self, bot: Alfred) -> None:
+        self.bot = bot
+        self.ttl = bot.config.get("tag_stats_ttl", SNAPSHOT_TTL)
+        self._snapshot: Optional[Snapshot] = None
+        self._owners: Dict[int, OwnerStats] = {}
+        self._lock = asyncio.Lock()
+
+    def _fresh(self, taken: float) -> bool:
+        return time.monotonic() - taken < self.ttl
+
+    async def snapshot(self) -> Snapshot:
+        snapshot = self._snapshot
+        if snapshot and self._fresh(snapshot.taken):
+            return snapshot
+
+        async with self._lock:
+            # someone else may have refreshed it while we were waiting
+            if self._snapshot and self._fresh(self._snapshot.taken):
+                return self._snapshot
+
+            self._snapshot = await self._read()
+            self._owners = {k: v for k, v in self._owners.items() if self._fresh(v.taken)}
+            return self._snapshot
+
+    async def owner(self, owner_id: int) -> OwnerStats:
+        stats = self._owners.get(owner_id)
+        if stats and self._fresh(stats.taken):
+            return stats
+
+        async with self.bot.db.acquire() as conn:
+            row = await self.bot.queries.fetchrow("stats.owner", owner_id, conn=conn)
+            top = await self.bot.queries.fetch("stats.owner_top", owner_id, LEADERBOARD_SIZE, conn=conn)
+
+        tags, uses = (row['tags'], row['uses']) if row else (0, 0)
+        stats = self._owners[owner_id] = OwnerStats(tags, uses, top, time.monotonic())
+        return stats
+
+    async def tag_recent(self, tag_id: int) -> int:
+        """Uses of a tag over the last ``RECENT_DAYS`` days."""
+        return await self.bot.tag_usage.uses(tag_id, RECENT_DAYS)
+
+    def rank(self, tag_id: int) -> Optional[int]:
+        """The tag's place on the last leaderboard read, if it's on there."""
+        if self._snapshot is None:
+            return None
+
+        for i, tag in enumerate(self._snapshot.top_tags, start=1):
+            if tag['id'] == tag_id:
+                return i
+        return None
+
+    async def _read(self) -> Snapshot:
+        async with self.bot.db.acquire() as conn:
+            # one snapshot, so the totals agree with the leaderboards
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                top_tags = await self.bot.queries.fetch("stats.top_tags", LEADERBOARD_SIZE, conn=conn)
+                top_owners = await self.bot.queries.fetch("stats.top_owners", LEADERBOARD_SIZE, conn=conn)
+                recent = await self.bot.queries.fetch("stats.recent", RECENT_DAYS, LEADERBOARD_SIZE, conn=conn)
+                totals = await self.bot.queries.fetchrow("stats.totals", conn=conn)
+
+        return Snapshot(top_tags, top_owners, recent, totals['tags'], totals['uses'], time.monotonic())
@@ -0,0 +1,298 @@
+"""
+Bulk tag import and export as NDJSON, one tag per line:
+
+    {"name": "...", "content": "...", "owner": 123, "uses": 4, "created": "2021-09-01T12:00:00", "aliases": ["..."]}
+
+Both directions stream through COPY, so memory use doesn't depend on how many tags there are.
+Exports can be taken from ``tags_new``/``tag_lookup`` or from the legacy ``tags`` table, imports
+always go into ``tags_new``/``tag_lookup``. From the command line::
+
+    python -m utils.tagtransfer export [--legacy] tags.ndjson
+    python -m utils.tagtransfer import tags.ndjson
+
+The owner-only ``tagexport``/``tagimport`` commands do the same from Discord.
+"""
+from __future__ import annotations
+
+import datetime
+import json
+
+import asyncpg
+import discord
+from typing import Any, AsyncIterable, Awaitable, Callable, Collection, List, Optional, Tuple, Union
+
+BATCH_SIZE = 5000  # lines per COPY into the staging table
+MAX_ERRORS = 10  # invalid lines and aliases reported individually, the rest are only counted
+
+# COPY's CSV output with a delimiter and quote character that JSON always escapes is the JSON, verbatim
+COPY_OPTIONS = dict(format='csv', delimiter='\x02', quote='\x01')
+
+EXPORT_QUERIES = {
+    'tags': """
+        SELECT
+            json_build_object(
+                'name', tn.name, 'content', tn.content, 'owner', tn.owner, 'uses', tn.uses, 'created', tn.created,
+                'aliases', COALESCE(a.names, '[]')
+            )
+        FROM tags_new tn
+        LEFT JOIN (
+            SELECT tagId, json_agg(name) AS names FROM tag_lookup WHERE isAlias GROUP BY tagId
+        ) AS a ON a.tagId = tn.id
+        """,
+    'legacy': """
+        SELECT
+            json_build_object('name', t.name, 'content', t.content, 'owner', t.owner_id, 'aliases', COALESCE(a.names, '[]'))
+        FROM tags t
+        LEFT JOIN (
+            SELECT aliases, json_agg(name) AS names FROM tags WHERE aliases IS NOT NULL GROUP BY aliases
+        ) AS a ON a.aliases = t.name
+        WHERE t.aliases IS NULL
+        """,
+}
+
+STAGING_COLUMNS = ('line', 'name', 'content', 'owner', 'uses', 'created', 'aliases')
+
+# first occurrence of a name wins, and nothing that's already a tag or alias is touched
+IMPORT_TAGS = """
+    WITH fresh AS (
+        SELECT DISTINCT ON (name)
+            *
+        FROM tag_import s
+        WHERE NOT EXISTS (SELECT 1 FROM tag_lookup tl WHERE tl.name = s.name)
+        ORDER BY name, line
+    ), inserted AS (
+        INSERT INTO tags_new (name, content, owner, uses, created)
+            SELECT name, content, owner, COALESCE(uses, 0), COALESCE(created, NOW() AT TIME ZONE 'utc') FROM fresh
+        ON CONFLICT (name) DO NOTHING
+        RETURNING id, name
+    ), names AS (
+        INSERT INTO tag_lookup (name, tagId, isAlias)
+            SELECT name, id, FALSE FROM inserted
+    ), aliases AS (
+        INSERT INTO tag_lookup (name, tagId, isAlias)
+            SELECT DISTINCT ON (a.alias)
+                a.alias, inserted.id, TRUE
+            FROM fresh
+            CROSS JOIN LATERAL unnest(fresh.aliases) AS a(alias)
+            INNER JOIN inserted ON inserted.name = fresh.name
+            WHERE
+                NOT EXISTS (SELECT 1 FROM tag_import s WHERE s.name = a.alias)
+                AND NOT EXISTS (SELECT 1 FROM tag_lookup tl WHERE tl.name = a.alias)
+            ORDER BY a.alias, fresh.line
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM inserted) AS tags, (SELECT COUNT(*) FROM aliases) AS aliases
+"""
+
+
+class ImportResult:
+    __slots__ = ("lines", "invalid", "invalid_aliases", "errors", "tags", "aliases")
+
+    def __init__(self) -> None:
+        self.lines = 0
+        self.invalid = 0
+        self.invalid_aliases = 0
+        self.errors: List[str] = []
+        self.tags = 0
+        self.aliases = 0
+
+    @property
+    def skipped(self) -> int:
+        """Valid lines that weren't imported, because the name was taken or repeated."""
+        return self.lines - self.invalid - self.tags
+
+    def summary(self) -> str:
+        text = (
+            f"{self.lines} lines: imported {self.tags} tags and {self.aliases} aliases, "
+            f"skipped {self.skipped} existing or duplicate names, {self.invalid} invalid lines, "
+            f"dropped {self.invalid_aliases} invalid aliases"
+        )
+        if self.errors:
+            text += "\n" + "\n".join(self.errors)
+            more = self.invalid + self.invalid_aliases - len(self.errors)
+            if more:
+                text += f"\n... and {more} more"
+        return text
+
+    def error(self, message: str) -> None:
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(message)
+
+
+def reserved_names(group: Any) -> set:
+    """The names of the ``tag`` group's subcommands and their aliases, which can't be tag names."""
+    return {name for command in group.commands for name in (command.name, *command.aliases)}
+
+
+def clean_name(name: Any, reserved: Collection[str], min_length: int = 3) -> Optional[str]:
+    # the same rules as /tag-add, or /tag-alias with a min_length of 1
+    if not isinstance(name, str):
+        return None
+    name = name.strip().lower()
+    if not min_length <= len(name) <= 32 or name.isdigit() or name in reserved:
+        return None
+    return name
+
+
+def parse_line(line: Union[str, bytes], number: int, reserved: Collection[str]) -> Tuple[tuple, List[Any]]:
+    """
+    Turns one NDJSON line into a staging row and the aliases that had to be dropped from it,
+    raising ValueError if it isn't a valid tag.
+    """
+    tag = json.loads(line)
+    if not isinstance(tag, dict):
+        raise ValueError("not an object")
+
+    name = clean_name(tag.get('name'), reserved)
+    if name is None:
+        raise ValueError(f"invalid name {tag.get('name')!r}")
+
+    content = tag.get('content')
+    if isinstance(content, str):
+        content = discord.utils.escape_mentions(content.strip())
+    if not isinstance(content, str) or not 1 <= len(content) <= 2000:
+        raise ValueError(f"{name}: content must be 1-2000 characters")
+
+    owner = tag.get('owner')
+    if not isinstance(owner, int) or isinstance(owner, bool) or not 0 <= owner < 2 ** 63:
+        raise ValueError(f"{name}: invalid owner")
+
+    uses = tag.get('uses')
+    if not isinstance(uses, int) or not 0 <= uses < 2 ** 31:
+        uses = None
+
+    created = tag.get('created')
+    try:
+        created = datetime.datetime.fromisoformat(created) if isinstance(created, str) else None
+    except ValueError:
+        created = None
+    if created and created.tzinfo:
+        created = created.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+    aliases = tag.get('aliases') or []
+    if not isinstance(aliases, list):
+        raise ValueError(f"{name}: aliases must be a list")
+    # invalid aliases are dropped on their own, the tag is still worth having
+    cleaned = [(alias, clean_name(alias, reserved, min_length=1)) for alias in aliases]
+    dropped = [alias for alias, clean in cleaned if clean is None]
+    aliases = list(dict.fromkeys(clean for _, clean in cleaned if clean and clean != name))
+
+    return (number, name, content, owner, uses, created, aliases), dropped
+
+
+async def export_tags(conn: asyncpg.Connection, output: Any, *, source: str = 'tags') -> None:
+    """Writes every tag as NDJSON to ``output``, a path, file-like object or coroutine function taking bytes."""
+    await conn.copy_from_query(EXPORT_QUERIES[source], output=output, **COPY_OPTIONS)
+
+
+async def import_tags(
+    conn: asyncpg.Connection,
+    lines: AsyncIterable[Union[str, bytes]],
+    *,
+    reserved: Collection[str] = (),
+    batch_size: int = BATCH_SIZE,
+    progress: Optional[Callable[[ImportResult], Awaitable[Any]]] = None,
+) -> ImportResult:
+    """
+    Imports NDJSON tags into ``tags_new``/``tag_lookup`` in a single transaction.
+
+    Lines are validated as they're read and COPYed into a temporary staging table in batches, then
+    deduplicated against each other and the existing tags and inserted in one statement. The change
+    triggers don't notify for the rows it inserts, the tag cache is told to reload once instead.
+    """
+    result = ImportResult()
+    async with conn.transaction():
+        await conn.execute("""
+            CREATE TEMPORARY TABLE tag_import (
+                line INT NOT NULL,
+                name TEXT NOT NULL,
+                content TEXT NOT NULL,
+                owner BIGINT NOT NULL,
+                uses INT,
+                created TIMESTAMP WITHOUT TIME ZONE,
+                aliases TEXT[] NOT NULL
+            ) ON COMMIT DROP
+        """)
+
+        batch = []
+        number = 0
+        async for line in lines:
+            number += 1
+            if not line.strip():
+                continue
+
+            result.lines += 1
+            try:
+                row, dropped = parse_line(line, number, reserved)
+            except ValueError as e:  # json.JSONDecodeError and UnicodeDecodeError included
+                result.invalid += 1
+                result.error(f"line {number}: {e}")
+                continue
+
+            batch.append(row)
+            for alias in dropped:
+                result.invalid_aliases += 1
+                result.error(f"line {number}: {row[1]}: invalid alias {alias!r}")
+
+            if len(batch) >= batch_size:
+                await conn.copy_records_to_table("tag_import", records=batch, columns=STAGING_COLUMNS)
+                batch = []
+                if progress:
+                    await progress(result)
+
+        if batch:
+            await conn.copy_records_to_table("tag_import", records=batch, columns=STAGING_COLUMNS)
+
+        await conn.execute("CREATE INDEX ON tag_import (name)")
+        await conn.execute("ANALYZE tag_import")
+
+        # notifyTagChange skips its per-row notifications until this transaction ends
+        await conn.execute("SET LOCAL alfred.bulk_import = 'on'")
+        counts = await conn.fetchrow(IMPORT_TAGS)
+        await conn.execute("""SELECT pg_notify('tag_changes', '{"op": "RELOAD"}')""")
+
+    result.tags = counts['tags']
+    result.aliases = counts['aliases']
+    return result
+
+
+async def _read_lines(path: str) -> AsyncIterable[str]:
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            yield line
+
+
+async def _main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('action', choices=('export', 'import'))
+    parser.add_argument('path')
+    parser.add_argument('--legacy', action='store_true', help="export the legacy tags table instead")
+    parser.add_argument('--dsn', help="defaults to the \"db\" DSN in config.json")
+    args = parser.parse_args()
+
+    dsn = args.dsn
+    if dsn is None:
+        with open('config.json') as f:
+            dsn = json.load(f)['db']
+
+    conn = await asyncpg.connect(dsn)
+    try:
+        if args.action == 'export':
+            await export_tags(conn, args.path, source='legacy' if args.legacy else 'tags')
+            print(f"exported to {args.path}")
+        else:
+            # the same names /tag-add and tagimport refuse
+            from cogs.devision import Devision
+
+            result = await import_tags(conn, _read_lines(args.path), reserved=reserved_names(Devision.tag))
+            print(result.summary())
+    finally:
+        await conn.close()
+
+
+if __name__ == '__main__':
+    import asyncio
+
+    asyncio.run(_main())
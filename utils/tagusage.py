@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import time
+
+import asyncpg
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from bot import Alfred
+
+FLUSH_INTERVAL = 30  # seconds, "tag_usage_flush" in config.json
+KEEP_EVENTS = 7  # days of raw events kept, "tag_usage_keep_events" in config.json
+KEEP_HOURLY = 90  # days of hourly rollups kept, "tag_usage_keep_hourly" in config.json; daily ones are kept forever
+MAX_BUFFERED = 100_000  # events held while flushes keep failing, "tag_usage_max_buffered" in config.json
+
+EVENT_COLUMNS = ('minute', 'tagid', 'userid', 'channelid', 'uses')
+
+# (tag id, user id, channel id, minute since the epoch)
+Event = Tuple[int, int, Optional[int], int]
+
+
+class TagUsage:
+    """
+    Write-behind tag usage events.
+
+    Every use is bucketed by minute and summed in memory per (tag, user, channel, minute). Every
+    ``interval`` seconds, and once more on shutdown, the buffer is COPYed into ``tag_usage_events`` and
+    added to ``tags_new.uses`` and the hourly and daily rollups in the same transaction, instead of
+    locking the tag's row on every invocation.
+
+    The rollups are what :meth:`uses`, :meth:`daily` and :meth:`hourly` read; the raw events are only
+    kept for a few days, for anything the rollups can't answer.
+
+    A failed flush keeps its events for the next one, up to ``max_buffered`` of them; past that new
+    ones are dropped and counted in ``dropped``.
+    """
+
+    def __init__(self, bot: Alfred) -> None:
+        self.bot = bot
+        self.interval = bot.config.get("tag_usage_flush", FLUSH_INTERVAL)
+        self.keep_events = bot.config.get("tag_usage_keep_events", KEEP_EVENTS)
+        self.keep_hourly = bot.config.get("tag_usage_keep_hourly", KEEP_HOURLY)
+        self.max_buffered = bot.config.get("tag_usage_max_buffered", MAX_BUFFERED)
+        self.dropped = 0  # uses lost to a full buffer
+        self._events: Dict[Event, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._pruned: Optional[int] = None  # the day old events were last pruned on
+
+    def record(self, tag_id: int, user_id: int, channel_id: Optional[int]) -> None:
+        key = (tag_id, user_id, channel_id, int(time.time() // 60))
+        self._add(key, 1)
+
+    def _add(self, key: Event, n: int) -> None:
+        if key in self._events:
+            self._events[key] += n
+        elif len(self._events) < self.max_buffered:
+            self._events[key] = n
+        else:
+            self.dropped += n
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = self.bot.loop.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            # shutting down regardless, the rest of bot_logout still has to run
+            print(f"[TAGS] Failed to flush tag uses on shutdown, {sum(self._events.values())} uses lost: {e!r}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+                await self.prune()
+            except Exception as e:
+                print(f"[TAGS] Failed to flush tag uses, retrying next time ({self.dropped} dropped so far): {e!r}")
+
+    async def flush(self) -> None:
+        if not self._events:
+            return
+
+        events, self._events = self._events, {}
+        records = []
+        per_minute: Dict[Tuple[int, int], int] = {}  # the rollups only care about (tag, minute)
+        for (tag_id, user_id, channel_id, minute), n in events.items():
+            records.append((datetime.datetime.utcfromtimestamp(minute * 60), tag_id, user_id, channel_id, n))
+            per_minute[tag_id, minute] = per_minute.get((tag_id, minute), 0) + n
+
+        tag_ids = [tag_id for tag_id, _ in per_minute]
+        minutes = [datetime.datetime.utcfromtimestamp(minute * 60) for _, minute in per_minute]
+        try:
+            async with self.bot.db.acquire() as conn:
+                async with conn.transaction():
+                    await conn.copy_records_to_table("tag_usage_events", records=records, columns=EVENT_COLUMNS)
+                    await self.bot.queries.execute("tags.add_uses", tag_ids, minutes, list(per_minute.values()), conn=conn)
+        except BaseException:
+            # keep them for the next flush rather than losing them, as long as there's room
+            for key, n in events.items():
+                self._add(key, n)
+            raise
+
+    async def prune(self) -> None:
+        today = int(time.time() // 86400)
+        if self._pruned == today:
+            return
+
+        async with self.bot.db.acquire() as conn:
+            await self.bot.queries.execute("usage.prune_events", self.keep_events, conn=conn)
+            await self.bot.queries.execute("usage.prune_hourly", self.keep_hourly, conn=conn)
+        self._pruned = today
+
+    async def uses(self, tag_id: int, days: int) -> int:
+        """Uses of a tag over the last ``days`` days, today included."""
+        return await self.bot.queries.fetchval("usage.total", tag_id, days)
+
+    async def daily(self, tag_id: int, days: int) -> List[asyncpg.Record]:
+        """(day, uses) for each of the last ``days`` days the tag was used on, oldest first."""
+        return await self.bot.queries.fetch("usage.daily", tag_id, days)
+
+    async def hourly(self, tag_id: int, hours: int) -> List[asyncpg.Record]:
+        """(hour, uses) for each of the last ``hours`` hours the tag was used in, oldest first."""
+        return await self.bot.queries.fetch("usage.hourly", tag_id, hours)
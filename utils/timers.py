@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import heapq
+import itertools
+import json
+
+import asyncpg
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from bot import Alfred
+
+MAX_ATTEMPTS = 5  # for a scheduled action, before it's left in the table for someone to look at
+RETRY_DELAY = 60  # seconds between attempts at a scheduled action that failed
+
+Handler = Callable[["Alfred", dict], Awaitable[Any]]
+
+
+class Timer:
+    __slots__ = ("when", "callback", "args", "cancelled", "_service")
+
+    def __init__(self, service: TimerService, when: float, callback: Callable, args: tuple) -> None:
+        self._service = service
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self._service._cancel(self)
+
+
+class TimerService:
+    """
+    Every deadline the bot is waiting on, in one heap, driven by a single ``loop.call_at`` for the
+    earliest of them.
+
+    In-memory timers (``call_later``/``call_at``) are for short waits like a modal's timeout.
+    ``Timer.cancel`` only marks one, the heap is compacted once most of it is cancelled. Scheduled
+    actions (``schedule``) are also kept in the ``scheduled_actions`` table, so they survive restarts:
+    they're loaded back in one go by ``start``, and run by the handler registered for them with ``action``.
+    """
+
+    def __init__(self, bot: Alfred) -> None:
+        self.bot = bot
+        self.handlers: Dict[str, Handler] = {}
+        self._heap: List[Tuple[float, int, Timer]] = []
+        self._counter = itertools.count()  # ties are broken by insertion order, timers never get compared
+        self._cancelled = 0
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._armed: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._cancelled
+
+    def action(self, name: str) -> Callable[[Handler], Handler]:
+        def decorator(func: Handler) -> Handler:
+            self.handlers[name] = func
+            return func
+        return decorator
+
+    def call_at(self, when: float, callback: Callable, *args: Any) -> Timer:
+        """Calls ``callback(*args)`` at ``when`` (in ``loop.time()``). Coroutine functions are run as tasks."""
+        timer = Timer(self, when, callback, args)
+        heapq.heappush(self._heap, (when, next(self._counter), timer))
+        self._arm()
+        return timer
+
+    def call_later(self, delay: float, callback: Callable, *args: Any) -> Timer:
+        return self.call_at(self.bot.loop.time() + delay, callback, *args)
+
+    def _cancel(self, timer: Timer) -> None:
+        if timer.cancelled:
+            return
+
+        # it stays in the heap until it comes up, or the heap is compacted
+        timer.cancelled = True
+        self._cancelled += 1
+        if self._cancelled > 64 and self._cancelled > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    async def schedule(self, action: str, due: datetime.datetime, payload: dict, *, conn: Optional[asyncpg.Connection] = None) -> asyncpg.Record:
+        """
+        Stores an action to run at ``due`` (naive UTC). With ``conn``, it's part of that connection's
+        transaction, and it's up to the caller to :meth:`add` the returned row once that's committed.
+        """
+        row = await self.bot.queries.fetchrow("timers.schedule", action, due, json.dumps(payload), conn=conn)
+        if conn is None:
+            self.add(row)
+        return row
+
+    def add(self, row: asyncpg.Record) -> Timer:
+        """Arms a stored action."""
+        delay = (row['due'] - datetime.datetime.utcnow()).total_seconds()
+        return self.call_later(max(delay, 0), self._run_action, row['id'], row['action'], row['payload'])
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = self.bot.loop.create_task(self._load())
+
+    def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+        if self._handle:
+            self._handle.cancel()
+        self._heap.clear()
+        self._cancelled = 0
+
+    async def _load(self) -> None:
+        # the handlers work with the guild and channel caches
+        await self.bot.wait_until_ready()
+        count = 0
+        async with self.bot.db.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                async for row in self.bot.queries.cursor("timers.pending", MAX_ATTEMPTS, conn=conn, prefetch=1000):
+                    self.add(row)
+                    count += 1
+
+        print(f"[TIMERS] Loaded {count} scheduled actions")
+
+    def _arm(self) -> None:
+        when = self._heap[0][0]
+        if self._armed is not None and self._armed <= when:
+            return
+
+        if self._handle:
+            self._handle.cancel()
+        self._armed = when
+        self._handle = self.bot.loop.call_at(when, self._fire)
+
+    def _fire(self) -> None:
+        self._handle = self._armed = None
+        now = self.bot.loop.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, timer = heapq.heappop(self._heap)
+            if timer.cancelled:
+                self._cancelled -= 1
+                continue
+
+            timer.cancelled = True  # so a late cancel() doesn't count it twice
+            try:
+                result = timer.callback(*timer.args)
+            except Exception as e:
+                print(f"[TIMERS] {timer.callback!r} raised {e!r}")
+                continue
+
+            if asyncio.iscoroutine(result):
+                self.bot.loop.create_task(result)
+
+        if self._heap:
+            self._arm()
+
+    async def _run_action(self, action_id: int, action: str, payload: str) -> None:
+        handler = self.handlers.get(action)
+        try:
+            if handler is None:
+                raise LookupError(f"no handler for {action}")
+            await handler(self.bot, json.loads(payload))
+        except Exception as e:
+            attempts = await self.bot.queries.fetchval("timers.failed", action_id)
+            if attempts is None:
+                # the row was deleted while the handler ran, there is nothing left to retry
+                print(f"[TIMERS] {action} (#{action_id}) failed after it was removed: {e!r}")
+                return
+
+            print(f"[TIMERS] {action} (#{action_id}) failed, attempt {attempts}: {e!r}")
+            if attempts < MAX_ATTEMPTS:
+                self.call_later(RETRY_DELAY, self._run_action, action_id, action, payload)
+            return
+
+        await self.bot.queries.execute("timers.done", action_id)
@@ -1,5 +1,7 @@
+import asyncio
 import discord
 import math
+from collections import OrderedDict
 from datetime import datetime
 from discord.ui import View, button, Button
 from discord import Interaction
@@ -88,6 +90,88 @@ class ApiNews(View):
 
 #!---------------
 
+class ListPageSource:
+    """Pages over a list that's already in memory."""
+
+    def __init__(self, entries, per_page):
+        self.entries = entries
+        self.per_page = per_page
+        self.total = len(entries)
+        self.pages = math.ceil(self.total/per_page)
+
+    async def get_page(self, page):
+        num = (page - 1) * self.per_page
+        return self.entries[num:num + self.per_page]
+
+    def close(self):
+        pass
+
+
+class KeysetPageSource:
+    """
+    Pages fetched from the database on demand, with keyset pagination.
+
+    ``fetch(after, limit)`` returns up to ``limit`` rows ordered by ``key`` whose key is greater than ``after``
+    (``start`` for the first page). Only the pages around the current one are kept, plus the key each page
+    starts after, and the next page is fetched in the background while the current one is being read.
+    The total is unknown until the last page has been reached.
+    """
+
+    def __init__(self, fetch, *, key, format=str, per_page=15, start=None):
+        self.fetch = fetch
+        self.key = key
+        self.format = format
+        self.per_page = per_page
+        self.total = None
+        self.pages = None
+        self._cursors = [start]  # _cursors[n - 1] is the key page n starts after
+        self._loaded = {}  # page -> task returning its entries
+
+    async def get_page(self, page):
+        entries = await self._load(page)
+
+        for n in list(self._loaded):
+            if abs(n - page) > 1:
+                self._loaded.pop(n).cancel()
+
+        if (self.pages is None or page < self.pages) and page + 1 not in self._loaded:
+            self._load(page + 1)
+
+        return entries
+
+    def _load(self, page):
+        task = self._loaded.get(page)
+        if task is None or (task.done() and (task.cancelled() or task.exception())):
+            task = self._loaded[page] = asyncio.ensure_future(self._fetch(page))
+        return task
+
+    async def _fetch(self, page):
+        if len(self._cursors) < page:
+            # the page before this one is still being fetched, and it's what says where this one starts
+            await asyncio.shield(self._load(page - 1))
+            if len(self._cursors) < page:
+                return []  # that was the last page
+
+        # a row past the end of the page tells us whether there's another one
+        rows = await self.fetch(self._cursors[page - 1], self.per_page + 1)
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if more:
+            if len(self._cursors) == page:
+                self._cursors.append(self.key(rows[-1]))
+        elif self.pages is None:
+            self.pages = page
+            self.total = (page - 1) * self.per_page + len(rows)
+
+        return [self.format(row) for row in rows]
+
+    def close(self):
+        for task in self._loaded.values():
+            task.cancel()
+        self._loaded.clear()
+
+
 class Paginator(View):
     def __init__(self, ctx, *args, **kwargs):
         super().__init__()
@@ -96,7 +180,6 @@ class Paginator(View):
         self.entries = kwargs.get('entries')
         self.per_page = kwargs.get('per_page', 15)
         self.page = 1
-        self.pages = math.ceil(len(self.entries)/self.per_page)
         self.paginating = False
 
         self.title = kwargs.get("title")
@@ -115,20 +198,32 @@ class Paginator(View):
         self.suffix = kwargs.get("suffix", "")
         self.entries_name = kwargs.get("entries_name", "entries")
 
+        # anything with get_page(page) -> entries, pages and total (None while unknown), and close()
+        self.source = kwargs.get("source") or ListPageSource(self.entries, self.per_page)
+        self.per_page = self.source.per_page
+
+        # rendered pages, so flipping back and forth doesn't rebuild them
+        self.cache_pages = kwargs.get("cache_pages", 10)
+        self._rendered = OrderedDict()
+        # presses are handled one at a time, each one moves on from the page the one before it showed
+        self._turning = asyncio.Lock()
+
+    @property
+    def pages(self):
+        return self.source.pages
+
     async def interaction_check(self, _, interaction: Interaction) -> bool:
         return interaction.user.id == self.ctx.author.id
 
-    def generate_page(self):
-        if not self.embedded:
-            page = []
+    def format_entries(self, entries):
+        if self.show_entry_nums:
             num = (self.page - 1) * self.per_page
-            if self.show_entry_nums:
-                for i, n in enumerate(self.entries, start=1):
-                    page.append(f"`[{i}]` {n}")
-                text = self.prefix + "\n".join(page[num:num + self.per_page]) + self.suffix
-            else:
-                text = self.prefix + "\n".join(self.entries[num:num + self.per_page]) + self.suffix
-            return text
+            entries = [f"`[{i}]` {n}" for i, n in enumerate(entries, start=num + 1)]
+        return self.prefix + "\n".join(entries) + self.suffix
+
+    def generate_page(self, entries):
+        if not self.embedded:
+            return self.format_entries(entries)
 
         e = discord.Embed(color=self.color)
         if self.thumbnail:
@@ -147,14 +242,7 @@ class Paginator(View):
         else:
             e.url = self.url
 
-        num = (self.page - 1) * self.per_page
-        if self.show_entry_nums:
-            x = []
-            for i, n in enumerate(self.entries, start=1):
-                x.append(f"`[{i}]` {n}")
-            e.description = self.prefix + "\n".join(x[num:num + self.per_page]) + self.suffix
-        else:
-            e.description = self.prefix + "\n".join(self.entries[num:num + self.per_page]) + self.suffix
+        e.description = self.format_entries(entries)
 
         title = ""
         if isinstance(self.title, list):
@@ -165,11 +253,11 @@ class Paginator(View):
             title = str(self.title)
 
 
-        if self.show_entry_count:
+        if self.show_entry_count and self.source.total is not None:
             if self.footertext != discord.Embed.Empty:
-                title += f" ({len(self.entries)} {self.entries_name})"
+                title += f" ({self.source.total} {self.entries_name})"
             else:
-                e.set_footer(text=f"{len(self.entries)} {self.entries_name}")
+                e.set_footer(text=f"{self.source.total} {self.entries_name}")
         else:
             pass
 
@@ -183,9 +271,33 @@ class Paginator(View):
             e.set_author(icon_url=self.ctx.author.avatar.with_static_format("png").url, name=self.author)
         return e
 
-    async def send_page(self, interaction):
-        self.children[2].label = f"{self.page}/{self.pages}"
-        page = self.generate_page()
+    async def render(self):
+        # the total is part of the page (see show_entry_count), and may only become known later on
+        key = (self.page, self.source.total)
+        page = self._rendered.get(key)
+        if page is None:
+            page = self.generate_page(await self.source.get_page(self.page))
+            if self.cache_pages:
+                self._rendered[key] = page
+                if len(self._rendered) > self.cache_pages:
+                    self._rendered.popitem(last=False)
+        else:
+            self._rendered.move_to_end(key)
+            if self.embedded and self.timestamp:
+                page.timestamp = datetime.utcnow()
+
+        self.children[2].label = f"{self.page}/{self.pages or '?'}"
+        self.children[4].disabled = self.pages is None
+        return page
+
+    async def send_page(self, interaction, number):
+        previous, self.page = self.page, number
+        try:
+            page = await self.render()
+        except Exception:
+            self.page = previous
+            raise
+
         if isinstance(page, str):
             await interaction.response.edit_message(content=page, view=self)
         else:
@@ -193,19 +305,19 @@ class Paginator(View):
 
     @button(label="◄◄", style=discord.ButtonStyle.blurple)
     async def beginning(self, button: Button, interaction: Interaction):
-        if self.page == 1:
-            await interaction.response.defer()
-        else:
-            self.page = 1
-            await self.send_page(interaction)
+        async with self._turning:
+            if self.page == 1:
+                await interaction.response.defer()
+            else:
+                await self.send_page(interaction, 1)
 
     @button(label="◄", style=discord.ButtonStyle.blurple)
     async def previous(self, button: Button, interaction: Interaction):
-        if self.page == 1:
-            await interaction.response.defer()
-        else:
-            self.page -= 1
-            await self.send_page(interaction)
+        async with self._turning:
+            if self.page == 1:
+                await interaction.response.defer()
+            else:
+                await self.send_page(interaction, self.page - 1)
 
     @button(label="...", style=discord.ButtonStyle.grey, disabled=True)
     async def pagenum(self, button: Button, interaction: Interaction):
@@ -213,29 +325,33 @@ class Paginator(View):
 
     @button(label="►", style=discord.ButtonStyle.blurple)
     async def next(self, button: Button, interaction: Interaction):
-        if self.page == self.pages:
-            await interaction.response.defer()
-        else:
-            self.page += 1
-            await self.send_page(interaction)
+        # while the number of pages is unknown, there's always another one
+        async with self._turning:
+            if self.page == self.pages:
+                await interaction.response.defer()
+            else:
+                await self.send_page(interaction, self.page + 1)
 
     @button(label="►►", style=discord.ButtonStyle.blurple)
     async def last(self, button: Button, interaction: Interaction):
-        if self.page == self.pages:
-            await interaction.response.defer()
-        else:
-            self.page = self.pages
-            await self.send_page(interaction)
+        async with self._turning:
+            if self.page == self.pages:
+                await interaction.response.defer()
+            else:
+                await self.send_page(interaction, self.pages)
 
     @button(label="⬜", style=discord.ButtonStyle.red)
     async def cancel(self, button: Button, interaction: Interaction):
         await interaction.response.defer()
         self.stop()
+        self.source.close()
         await interaction.message.delete()
 
+    async def on_timeout(self):
+        self.source.close()
+
     async def start(self):
-        self.children[2].label = f"{self.page}/{self.pages}"
-        page = self.generate_page()
+        page = await self.render()
         if isinstance(page, str):
             await self.ctx.send(page, view=self)
         else: